@@ -1,82 +1,99 @@
 import streamlit as st
-from utils.language_handler import language_handler
-from utils.llm_groq_client import groq_client
+from utils.language_handler import QUESTION_OPTIONS, language_handler, spoken_question, static_phrases
 from utils.unified_vision_handler import unified_vision_handler
-from utils.image_handler import image_handler
 from utils.rule_based_fallbacks import get_crop_fallback, get_disease_fallback, get_irrigation_fallback
 from utils.voice_input_widget import voice_input_widget
 from utils.data_handler import get_farmer_data, save_farmer_data, clear_farmer_data
-from utils.tracking_logic import calculate_crop_age, get_crop_stage, get_mock_weather
+from utils.tracking_logic import calculate_crop_age, get_crop_stage, get_weather
+from utils.daily_advisory import current_inputs_hash, get_stored_advisory, store_advisory
+from utils.llm_groq_client import is_error_response
+from utils.metrics import metrics, serve_from_env
+from utils.token_budget import llm_mode, plan_prompt
 from datetime import datetime, date
-from gtts import gTTS
 import os
-import io
-import base64
-
-import re
+import uuid
 
 # ... existing code ...
 
 # Page Config
 st.set_page_config(page_title="AI Farming Assistant", layout="wide", page_icon="🌾")
 
+# Shared clients: created on first use, once per server process, and reused by every session
+@st.cache_resource
+def get_llm_router():
+    from utils.llm_router import llm_router
+    return llm_router
+
+@st.cache_resource
+def get_image_handler():
+    from utils.image_handler import image_handler
+    return image_handler
+
+# Prometheus endpoint on METRICS_PORT (once per server process)
+@st.cache_resource
+def start_metrics_endpoint():
+    return serve_from_env()
+
+start_metrics_endpoint()
+
+# Prompt templates: compiled once, hot-reloaded on edit, checked against the calls below at startup
+@st.cache_resource
+def get_prompt_registry():
+    from utils.prompt_registry import prompt_registry, validate_in_background
+    here = os.path.dirname(os.path.abspath(__file__))
+    prompt_registry.names()  # load and compile every template now
+    validate_in_background([here, os.path.join(here, "utils")])
+    return prompt_registry
+
+get_prompt_registry()
+
 # Load Prompt Functions
 def load_prompt(filename):
-    try:
-        with open(f"prompts/{filename}", "r", encoding="utf-8") as f:
-            return f.read()
-    except:
-        return ""
+    """Template text; raises PromptError if the template does not exist."""
+    with metrics.timer("prompt_load", template=filename) as span:
+        text = get_prompt_registry().text(filename)
+        span.set(chars=len(text))
+        return text
+
+# Spoken prompts are synthesised once per process (and kept on disk across restarts)
+@st.cache_resource
+def prewarm_tts_cache():
+    from utils.tts_cache import prewarm_in_background
+    from utils.tts_pipeline import speech_chunks
+    # Warm the same sentence chunks auto_play_audio will ask for
+    return prewarm_in_background({
+        lang: [chunk for phrase in static_phrases(lang) for chunk in speech_chunks(phrase, lang)]
+        for lang in ("en", "hi")
+    })
 
-def clean_text_for_tts(text):
-    """Clean text for better speech synthesis."""
-    if not text: return ""
-    # Remove markdown formatting
-    text = re.sub(r'[*_#`]', '', text) 
-    text = text.replace('•', '')
-    text = text.replace('-', '') 
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+prewarm_tts_cache()
 
-# Auto-play Audio Function using gTTS
-def auto_play_audio(text, lang='en'):
+# Auto-play Audio Function (gTTS, or a local engine when offline)
+def auto_play_audio(text, lang='en', max_seconds=None):
     """
-    Convert text to speech and auto-play using gTTS
-    Works reliably on all platforms
+    Convert text to speech and auto-play it
+    Works reliably on all platforms. Text is spoken sentence by sentence, up to
+    max_seconds (TTS_MAX_SECONDS by default); the first sentence starts playing
+    while the rest are still being synthesised.
     """
     if not text or len(text.strip()) == 0:
         return
-        
-    # CLEANUP before TTS
-    text = clean_text_for_tts(text)
-    
+
     try:
-        # Create TTS
-        lang_code = 'hi' if lang == 'hi' else 'en'
-        # Use 'co.in' TLD for better connectivity in India
-        tts = gTTS(text=text, lang=lang_code, tld='co.in', slow=False)
-        
-        # Save to bytes
-        audio_fp = io.BytesIO()
-        tts.write_to_fp(audio_fp)
-        audio_fp.seek(0)
-        
-        # Convert to base64 for HTML audio
-        audio_bytes = audio_fp.read()
-        audio_base64 = base64.b64encode(audio_bytes).decode()
-        
-        # Auto-play using HTML audio with autoplay
-        audio_html = f"""
-        <audio autoplay>
-            <source src="data:audio/mp3;base64,{audio_base64}" type="audio/mp3">
-        </audio>
-        """
-        st.markdown(audio_html, unsafe_allow_html=True)
-        
+        from utils.audio_player import queue_audio_clip
+        from utils.audio_media import audio_src
+        from utils.tts_pipeline import speech_chunks, synthesize_chunks
+        utterance = uuid.uuid4().hex
+        for index, key, audio_bytes in synthesize_chunks(speech_chunks(text, lang, max_seconds), lang):
+            # Played by reference from /audio/<hash> (browser-cached); inline only without serve_app.py
+            queue_audio_clip(audio_src(key, audio_bytes), utterance, index)
+
     except Exception as e:
-        # Graceful error handling - don't crash the UI
-        st.toast(f"Voice unavailable: Network error", icon="🔇")
-        # st.error(f"Audio Error: {e}") # Debugging only
+        # Graceful error handling - don't crash the UI. Synthesis, audio_src and the
+        # player (st.html) can all fail here, so log and count it on this path
+        print(f"Voice playback failed: {type(e).__name__}: {e}")
+        metrics.inc("tts_playback_errors", error=type(e).__name__)
+        st.toast("Voice unavailable", icon="🔇")
 
 # Session State
 if "messages" not in st.session_state: st.session_state.messages = []
@@ -160,22 +177,24 @@ if mode == language_handler.get_text("crop_rec"):
         with st.spinner("Analyzing soil & climate data..."):
             try:
                 # 3. LLM Call
-                prompt = load_prompt("crop_prompt.txt").format(
+                request = plan_prompt(
+                    "crop", load_prompt("system_prompt.txt"), load_prompt("crop_prompt.txt"), st.session_state.lang,
                     location=location, season=season, priority=priority,
                     soil_type=final_soil,
                     water=final_water
                 )
-                sys = load_prompt("system_prompt.txt") + f"\nRESPOND IN {st.session_state.lang} LANGUAGE."
-                response = groq_client.get_completion(prompt, system_instruction=sys)
                 
-                # 4. Text-Only Output
-                st.markdown(response)
+                # 4. Text-Only Output, rendered token by token
+                with llm_mode("crop"):
+                    response = st.write_stream(get_llm_router().stream_completion(
+                        request.prompt, system_instruction=request.system, max_tokens=request.max_tokens))
                 
                 # Voice DISABLED by default for this feature as per rules
-                # auto_play_audio(response[:300], st.session_state.lang) 
+                # auto_play_audio(response, st.session_state.lang) 
                 
             except Exception as e:
                 st.error(f"Error: {e}")
+                st.warning(get_crop_fallback(location, season, lang=st.session_state.lang))
 
 # Feature: Irrigation Planning
 elif mode == language_handler.get_text("irrigation"):
@@ -214,22 +233,25 @@ elif mode == language_handler.get_text("irrigation"):
         
         with st.spinner("Generating Irrigation Plan..." if st.session_state.lang == "en" else "सिंचाई योजना तैयार हो रही है..."):
             try:
-                sys = load_prompt("system_prompt.txt") + f"\nRESPOND IN {st.session_state.lang}"
-                prompt = load_prompt("irrigation_prompt.txt").format(
+                request = plan_prompt(
+                    "irrigation", load_prompt("system_prompt.txt"), load_prompt("irrigation_prompt.txt"),
+                    st.session_state.lang,
                     location=location,
                     crop=crop,
                     soil_type=final_soil,
                     water=rainfall
                 )
+                prompt = request.prompt
                 # Append user method preference if specified
                 if method != "Not Sure":
                     prompt += f"\nUser Query: Is {method} irrigation suitable?"
                     
-                response = groq_client.get_completion(prompt, system_instruction=sys)
-                st.success(response)
+                with st.container(border=True), llm_mode("irrigation"):
+                    response = st.write_stream(get_llm_router().stream_completion(
+                        prompt, system_instruction=request.system, max_tokens=request.max_tokens))
                 
                 # 1. Voice DISABLED by default
-                # auto_play_audio(response[:300], st.session_state.lang)
+                # auto_play_audio(response, st.session_state.lang)
                 
             except Exception as e:
                 # Fixed Fallback Call
@@ -241,19 +263,22 @@ elif mode == language_handler.get_text("irrigation"):
 elif mode == language_handler.get_text("disease"):
     uploaded_file = st.file_uploader(language_handler.get_text("upload_image"), type=["jpg", "jpeg", "png"])
     if uploaded_file:
-        image = image_handler.process_image(uploaded_file)
+        image = get_image_handler().process_image(uploaded_file)
         st.image(image, caption="Crop Image", use_container_width=True)
         if st.button("🔍 Analyze Crop Disease"):
             with st.spinner("Analyzing with AI (trying multiple models)..."):
-                sys = load_prompt("system_prompt.txt") + f"\nRESPOND IN {st.session_state.lang}"
-                response, api_used = unified_vision_handler.get_vision_response(
-                    load_prompt("disease_prompt.txt").format(crop_name="Unknown"),
-                    image, system_instruction=sys
+                request = plan_prompt(
+                    "disease", load_prompt("system_prompt.txt"), load_prompt("disease_prompt.txt"),
+                    st.session_state.lang, crop_name="Unknown"
                 )
+                with llm_mode("disease"):
+                    response, api_used = unified_vision_handler.get_vision_response(
+                        request.prompt, image, system_instruction=request.system, max_tokens=request.max_tokens
+                    )
                 st.success(f"✅ Analysis complete (API: {api_used})")
                 st.markdown(response)
                 # Auto-play audio response
-                auto_play_audio(response[:300], st.session_state.lang)
+                auto_play_audio(response, st.session_state.lang)
 
 # Feature: Track Farming
 elif mode == "Track Farming":
@@ -311,19 +336,25 @@ elif mode == "Track Farming":
                 st.info(f"📅 Planted on: {p_date_str}")
                 
                 # Weather
-                weather = get_mock_weather(farmer_data['location'])
+                weather = get_weather(farmer_data['location'])
                 st.metric("Current Weather", f"{weather['temp']}, {weather['condition']}")
                 
+                # Advisory materialised overnight (or earlier today) for these exact inputs
+                advisory_hash = current_inputs_hash(farmer_data, weather, st.session_state.lang)
+                stored_advisory = get_stored_advisory(st.session_state.farmer_id, advisory_hash, st.session_state.lang)
+                if stored_advisory:
+                    st.write("### " + ("Today's Advisory" if st.session_state.lang == "en" else "आज की सलाह"))
+                    st.markdown(stored_advisory)
+                
             with col2:
                 st.write("### Actions")
-                if st.button("Generate Today's Advisory" if st.session_state.lang == "en" else "आज की सलाह प्राप्त करें"):
+                if not stored_advisory and st.button("Generate Today's Advisory" if st.session_state.lang == "en" else "आज की सलाह प्राप्त करें"):
                     with st.spinner("Analyzing Farm Status..."):
                         try:
-                            # Strict Language Instruction
-                            lang_instruction = "Respond ONLY in HINDI." if st.session_state.lang == 'hi' else "Respond ONLY in ENGLISH."
-                            sys_instruction = load_prompt("system_prompt.txt") + f"\n{lang_instruction}"
-                            
-                            prompt = load_prompt("tracking_prompt.txt").format(
+                            # Strict language instruction is appended by the planner
+                            request = plan_prompt(
+                                "tracking", load_prompt("system_prompt.txt"), load_prompt("tracking_prompt.txt"),
+                                st.session_state.lang,
                                 crop_name=farmer_data['crop_name'],
                                 plantation_date=p_date_str,
                                 age=age_days,
@@ -333,9 +364,13 @@ elif mode == "Track Farming":
                                 fertilizer=farmer_data['fertilizer'],
                                 weather=f"{weather['temp']}, {weather['condition']}, {weather['forecast']}"
                             )
-                            advisory = groq_client.get_completion(prompt, system_instruction=sys_instruction)
+                            with llm_mode("tracking"):
+                                advisory = get_llm_router().get_completion(
+                                    request.prompt, system_instruction=request.system, max_tokens=request.max_tokens)
                             st.markdown(advisory)
-                            auto_play_audio(advisory[:400], st.session_state.lang)
+                            if not is_error_response(advisory):
+                                store_advisory(st.session_state.farmer_id, advisory_hash, st.session_state.lang, advisory)
+                            auto_play_audio(advisory, st.session_state.lang)
                         except Exception as e:
                             st.error(f"Error: {e}")
                 
@@ -390,30 +425,6 @@ else:
         "disease": []
     }
     
-    # QUESTION OPTIONS (Bilingual)
-    QUESTION_OPTIONS = {
-        "q_season": {
-            "en": ["Kharif", "Rabi", "Zaid"],
-            "hi": ["खरीफ", "रबी", "जायद"]
-        },
-        "q_profit": {
-            "en": ["Low", "Medium", "High"],
-            "hi": ["कम", "मध्यम", "अधिक"]
-        },
-        "q_soil": {
-            "en": ["Clay", "Sandy", "Loamy", "Black", "Red", "Not sure"],
-            "hi": ["चिकनी", "रेतीली", "दोमट", "काली", "लाल", "पता नहीं"]
-        },
-        "q_water": {
-             "en": ["Low", "Medium", "High", "Not sure"],
-             "hi": ["कम", "मध्यम", "अधिक", "पता नहीं"]
-        },
-        "q_rainfall": {
-             "en": ["Low", "Medium", "High"],
-             "hi": ["कम", "मध्यम", "अधिक"]
-        }
-    }
-    
     # STEP 1: Welcome
     if st.session_state.voice_step == "welcome":
         msg = language_handler.get_text("welcome")
@@ -455,20 +466,24 @@ else:
             uploaded_file = st.file_uploader("Image" if st.session_state.lang == "en" else "तस्वीर", type=["jpg", "jpeg", "png"])
             
             if uploaded_file:
-                img = image_handler.process_image(uploaded_file)
+                img = get_image_handler().process_image(uploaded_file)
                 st.image(img, use_column_width=True)
                 
                 if st.button("🔍 Analyze" if st.session_state.lang == "en" else "🔍 विश्लेषण"):
                     with st.spinner("Analyzing..." if st.session_state.lang == "en" else "विश्लेषण..."):
                         try:
-                            sys = load_prompt("system_prompt.txt") + f"\nRESPOND IN {st.session_state.lang}"
-                            result, api_used = unified_vision_handler.get_vision_response(
-                                load_prompt("disease_prompt.txt").format(crop_name="Unknown"),
-                                img, system_instruction=sys
+                            request = plan_prompt(
+                                "disease", load_prompt("system_prompt.txt"), load_prompt("disease_prompt.txt"),
+                                st.session_state.lang, crop_name="Unknown"
                             )
+                            with llm_mode("disease"):
+                                result, api_used = unified_vision_handler.get_vision_response(
+                                    request.prompt, img, system_instruction=request.system,
+                                    max_tokens=request.max_tokens
+                                )
                             st.session_state.messages.append({"role": "assistant", "content": result})
                             st.success(f"✅ {result}\n\n_(API: {api_used})_")
-                            auto_play_audio(result[:300], st.session_state.lang)
+                            auto_play_audio(result, st.session_state.lang)
                         except Exception as e:
                             st.error(f"Error during analysis: {e}")
                             fallback = get_disease_fallback()
@@ -491,14 +506,9 @@ else:
                 
                 question_hash = f"{flow}_{current_q}_{st.session_state.lang}"
                 if question_hash not in st.session_state.audio_played:
-                    # Construct spoken text with options
-                    spoken_text = question_text
-                    if options:
-                        opts_str = ", ".join(options)
-                        spoken_text += ". " + ("Options are: " if st.session_state.lang == 'en' else "विकल्प हैं: ") + opts_str
-                    
+                    # Same text as the pre-warmed clip, so this plays from the cache
                     st.info(f"🤖 {question_text}")
-                    auto_play_audio(spoken_text, st.session_state.lang)
+                    auto_play_audio(spoken_question(current_q, st.session_state.lang), st.session_state.lang)
                     st.session_state.audio_played.add(question_hash)
                 else:
                     st.info(f"🤖 {question_text}")
@@ -522,32 +532,38 @@ else:
         
         with st.spinner("Generating..." if st.session_state.lang == "en" else "तैयार हो रहा है..."):
             try:
-                sys_instruction = load_prompt("system_prompt.txt") + f"\n\nRESPOND IN {st.session_state.lang.upper()} LANGUAGE. BE CONCISE AND PRACTICAL. MAX 100 WORDS."
+                # Spoken answers: smaller budget, word limit and no markdown layout
+                system_prompt = load_prompt("system_prompt.txt")
                 if flow == "crop":
                     data = st.session_state.data_slots
-                    prompt = load_prompt("crop_prompt.txt").format(
+                    request = plan_prompt(
+                        "smart_talk", system_prompt, load_prompt("crop_prompt.txt"), st.session_state.lang,
                         location=data.get('q_location', 'Unknown'),
                         season=data.get('q_season', 'Unknown'),
                         priority=data.get('q_profit', 'Medium'),
                         soil_type=data.get('q_soil', 'Not specified'),
                         water=data.get('q_water', 'Normal')
                     )
-                    result = groq_client.get_completion(prompt, system_instruction=sys_instruction)
                 elif flow == "irrigation":
                     data = st.session_state.data_slots
-                    prompt = load_prompt("irrigation_prompt.txt").format(
+                    request = plan_prompt(
+                        "smart_talk", system_prompt, load_prompt("irrigation_prompt.txt"), st.session_state.lang,
                         location=data.get('q_location', 'Unknown'),
                         crop=data.get('q_crop', 'Unknown'),
-                        soil=data.get('q_soil', 'Not specified'),
-                        rainfall=data.get('q_rainfall', 'Normal')
+                        soil_type=data.get('q_soil', 'Not specified'),
+                        water=data.get('q_rainfall', 'Normal')
                     )
-                    result = groq_client.get_completion(prompt, system_instruction=sys_instruction)
+                
+                if flow in ("crop", "irrigation"):
+                    with llm_mode("smart_talk"):
+                        result = st.write_stream(get_llm_router().stream_completion(
+                            request.prompt, system_instruction=request.system, max_tokens=request.max_tokens))
                 else:
                     result = "An unexpected flow occurred."
+                    st.success(result)
                 
                 st.session_state.messages.append({"role": "assistant", "content": result})
-                st.success(result)
-                auto_play_audio(result[:500], st.session_state.lang)
+                auto_play_audio(result, st.session_state.lang)
             except Exception as e:
                 st.error(f"Error during generation: {e}")
                 
@@ -0,0 +1,45 @@
+"""
+Benchmark: per-farmer calculate_crop_age/get_crop_stage loop vs bulk_crop_stages.
+
+Usage: python bench_crop_stages.py [num_farmers]
+"""
+
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from utils.tracking_logic import bulk_crop_stages, calculate_crop_age, get_crop_stage
+
+CROPS = ["Wheat", "Basmati Rice", "Cotton", "Mustard", "wheat (HD-2967)", "Sugarcane"]
+
+
+def main():
+    num_farmers = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    today = date(2026, 10, 18)
+
+    rng = np.random.default_rng(42)
+    offsets = rng.integers(0, 200, num_farmers)
+    crop_names = [CROPS[i % len(CROPS)] for i in range(num_farmers)]
+    plantation_dates = [str(today - timedelta(days=int(d))) for d in offsets]
+
+    start = time.perf_counter()
+    result = bulk_crop_stages(crop_names, plantation_dates, today=today)
+    bulk_seconds = time.perf_counter() - start
+
+    # The scalar path is slow; time a sample and extrapolate
+    sample = min(num_farmers, 100_000)
+    start = time.perf_counter()
+    looped = [get_crop_stage(crop_names[i], calculate_crop_age(plantation_dates[i], today=today)) for i in range(sample)]
+    loop_seconds = (time.perf_counter() - start) * num_farmers / sample
+
+    mismatches = sum(1 for i in range(sample) if looped[i] != result.stage_names[i])
+    print(f"{num_farmers} farmers")
+    print(f"  per-farmer loop : {loop_seconds:8.2f}s (extrapolated from {sample})")
+    print(f"  bulk_crop_stages: {bulk_seconds:8.2f}s  ({loop_seconds / bulk_seconds:.0f}x faster)")
+    print(f"  mismatches vs scalar path in sample: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: Track Farming rerun latency for get_farmer_data with 100k farmers.
+Compares the old whole-file JSON parse, an uncached store lookup, and the cached read path.
+
+Usage: python bench_farmer_cache.py [num_farmers] [num_reruns]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import utils.data_handler as data_handler
+from utils.farmer_store import FarmerStore
+
+
+def make_record(i):
+    return {
+        "crop_name": "Wheat" if i % 2 else "Rice",
+        "location": f"District {i % 700}, Punjab",
+        "soil_type": "Loamy",
+        "fertilizer": "Urea",
+        "plantation_date": "2026-09-01"
+    }
+
+
+def measure(fn, reruns):
+    samples = []
+    for i in range(reruns):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    num_farmers = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    reruns = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "farmers_data.json")
+        records = {f"{i:06d}": make_record(i) for i in range(num_farmers)}
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=4, ensure_ascii=False)
+
+        store = FarmerStore(db_path=os.path.join(tmp, "farmers.db"), legacy_json_path=json_path)
+        store.count()  # triggers the one-time migration
+        data_handler.farmer_store = store
+
+        def legacy_read(i):
+            with open(json_path, "r", encoding="utf-8") as f:
+                json.load(f).get(f"{i % 50:06d}", {})
+
+        def store_read(i):
+            store.get(f"{i % 50:06d}")
+
+        def cached_read(i):
+            data_handler.get_farmer_data(f"{i % 50:06d}")
+
+        print(f"{num_farmers} farmers, {reruns} reruns (ms per get_farmer_data call)")
+        print(f"{'path':<22}{'p50':>10}{'p95':>10}")
+        for name, fn, n in [
+            ("legacy JSON parse", legacy_read, min(reruns, 20)),
+            ("store, uncached", store_read, reruns),
+            ("store, cached", cached_read, reruns),
+        ]:
+            p50, p95 = measure(fn, n)
+            print(f"{name:<22}{p50:>10.3f}{p95:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
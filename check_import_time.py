@@ -0,0 +1,94 @@
+"""
+Startup import-time check for app.py (python -X importtime).
+
+Examples:
+    python check_import_time.py
+    python check_import_time.py --budget-ms 200 --runs 5
+
+Streamlit itself is imported before measuring, and Streamlit modules the page
+pulls in lazily (emojis, config, ...) are subtracted, so the number is what
+app.py and utils add on top of it. Fails (exit 1) if that exceeds the budget, or if any
+provider SDK or heavy library is imported at startup instead of on first use.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "150"))
+
+# Must stay out of startup: loaded lazily by the code paths that need them
+LAZY_MODULES = ["groq", "gtts", "google.generativeai", "numpy", "httpx", "requests", "PIL"]
+
+MEASURE = "import streamlit; import app"
+
+
+def profile_once():
+    """(app microseconds excluding Streamlit, {module: (self_us, cumulative_us)}) for one cold start."""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", MEASURE],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    modules = {}
+    children = []  # direct children of the current top-level import (listed before it)
+    streamlit_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header row
+        name = parts[2].strip()
+        depth = (len(parts[2]) - len(parts[2].lstrip()) - 1) // 2
+        modules[name] = (self_us, cumulative_us)
+        if depth == 1:
+            children.append((name, cumulative_us))
+        elif depth == 0:
+            if name == "app":
+                streamlit_us = sum(cum for child, cum in children if child.split(".")[0] == "streamlit")
+            children = []
+    if "app" not in modules:
+        raise RuntimeError(f"import app failed:\n{result.stderr[-2000:]}")
+    return modules["app"][1] - streamlit_us, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check app.py startup import time against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="cold starts to measure; the fastest is reported")
+    parser.add_argument("--top", type=int, default=15, help="slowest project modules to list")
+    args = parser.parse_args(argv)
+
+    runs = [profile_once() for _ in range(args.runs)]
+    app_us, modules = min(runs, key=lambda run: run[0])
+    app_ms = app_us / 1000
+
+    print(f"app.py import, excluding Streamlit: {app_ms:.1f} ms (budget {args.budget_ms:.0f} ms, best of {args.runs})")
+    print("Slowest modules imported by app (cumulative ms):")
+    ours = sorted(
+        ((name, cum) for name, (_, cum) in modules.items() if name == "app" or name.startswith("utils")),
+        key=lambda item: item[1], reverse=True
+    )
+    for name, cumulative_us in ours[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}  {name}")
+
+    failures = []
+    eager = [name for name in LAZY_MODULES if name in modules]
+    if eager:
+        failures.append(f"imported at startup instead of lazily: {', '.join(eager)}")
+    if app_ms > args.budget_ms:
+        failures.append(f"{app_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
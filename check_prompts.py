@@ -0,0 +1,34 @@
+"""
+Check the prompt templates against their call sites (CI / pre-deploy).
+
+Examples:
+    python check_prompts.py
+
+Every template in prompts/ must compile, and every call that renders one must
+pass exactly its placeholders. The app runs the same check at startup but only
+logs the problems; this exits 1 on any.
+"""
+
+import os
+import sys
+
+from utils.prompt_registry import prompt_registry, source_files
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    os.chdir(HERE)
+    problems = prompt_registry.validate(source_files([HERE, os.path.join(HERE, "utils")]))
+    for name in prompt_registry.names():
+        fields = ", ".join(sorted(prompt_registry.get(name).fields)) or "-"
+        print(f"  {name:<28} {fields}")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ templates match their call sites")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
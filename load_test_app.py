@@ -0,0 +1,378 @@
+"""
+Concurrent-session load test for app.py using Streamlit's AppTest.
+
+Examples:
+    python load_test_app.py
+    python load_test_app.py --sessions 200 --concurrency 50 --latency lognormal:0.6,0.4
+    python load_test_app.py --report run.json --baseline last_good.json --tolerance 0.25
+
+Every session drives the app headlessly through:
+    smart_talk      welcome -> select_category -> gathering (5 answers) -> finalizing
+    crop_suggestion form + streamed recommendation
+    track_farming   login -> register a crop -> generate today's advisory
+
+LLM calls go to the in-process mock server (mock_llm_server.py) and gTTS is
+replaced by a stub, so nothing leaves the machine. Farmer data and caches live in
+a temporary directory.
+
+The report has per-step rerun latency percentiles, session throughput and peak
+memory (tracemalloc and RSS). The exit code is 1 when a gate fails: exceptions or
+errors above --max-error-rate, a step p95 above --p95-budget-ms, peak traced
+memory above --max-peak-mb, or a step p95 more than --tolerance slower than --baseline.
+tracemalloc slows every rerun noticeably, so compare reports produced with the
+same flags (or use --no-tracemalloc for latency-only gates).
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(REPO_DIR, "app.py")
+STEP_TIMEOUT = 60
+
+EN = None  # English UI strings, loaded after the environment is prepared
+
+
+class StubTTS:
+    """Stand-in for gtts.gTTS: no network, fixed synthesis delay."""
+    delay = 0.0
+
+    def __init__(self, text, lang="en", tld="com", slow=False, **kwargs):
+        self.text = text
+
+    def write_to_fp(self, fp):
+        time.sleep(self.delay)
+        fp.write(b"ID3" + b"\x00" * min(2048, 16 * len(self.text)))
+
+
+class SessionFailure(Exception):
+    pass
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.failures = defaultdict(int)
+        self.app_errors = defaultdict(int)
+        self.messages = []
+        self.lock = threading.Lock()
+
+    def step(self, at, name, action=None):
+        """Run one rerun (optionally after a widget action) and record its latency."""
+        start = time.perf_counter()
+        if action is None:
+            at.run(timeout=STEP_TIMEOUT)
+        else:
+            action().run(timeout=STEP_TIMEOUT)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.samples[name].append(elapsed)
+            if at.exception:
+                self.failures[name] += 1
+                self.messages.append(f"{name}: {at.exception[0].value}")
+            elif at.error:
+                self.app_errors[name] += 1
+                self.messages.append(f"{name}: st.error {at.error[0].value}")
+        if at.exception:
+            raise SessionFailure(name)
+        return at
+
+
+def _button(at, label):
+    for button in at.button:
+        if button.label == label:
+            return button
+    raise SessionFailure(f"button not found: {label}")
+
+
+def install_shared_runtime():
+    """
+    AppTest swaps a mock Runtime into a global on every run and clears it after,
+    which breaks when sessions run on parallel threads. It also recompiles the
+    script on every run and resets the process-wide "pages/ directory" flag.
+    Pin one shared mock runtime, one bytecode cache and the pages flag instead,
+    the way a real server process shares them across sessions.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.pages_manager import PagesManager
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    config.set_option("global.appTest", True)
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    # AppTest sets PagesManager.uses_pages_directory = None before each run; point that
+    # write at a subclass so the flag the script runner reads stays fixed
+    PagesManager.uses_pages_directory = os.path.isdir(os.path.join(REPO_DIR, "pages"))
+    app_test.PagesManager = type("PinnedPagesManager", (PagesManager,), {})
+
+
+_components = None
+
+
+def _new_app():
+    global _components
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=STEP_TIMEOUT)
+    # Component discovery scans every installed package; do it once, not per session
+    if _components is None:
+        at.run(timeout=STEP_TIMEOUT)
+        _components = at._bidi_component_manager
+        return AppTest.from_file(APP_PATH, default_timeout=STEP_TIMEOUT)
+    at._bidi_component_manager = _components
+    return at
+
+
+def _select_mode(rec, at, flow, label):
+    rec.step(at, f"{flow}.open")
+    rec.step(at, f"{flow}.select_mode", lambda: at.sidebar.radio[0].set_value(label))
+
+
+def smart_talk(rec, session_id):
+    at = _new_app()
+    _select_mode(rec, at, "smart_talk", EN["chat"])            # welcome
+    rec.step(at, "smart_talk.select_category")                 # category prompt
+    rec.step(at, "smart_talk.choose_crop", lambda: at.button(key="cat_0").click())
+    rec.step(at, "smart_talk.gathering", lambda: at.chat_input[0].set_value(f"Village {session_id}, Pune"))
+    for question, option in (("q_season", 0), ("q_profit", 1), ("q_soil", 2), ("q_water", 1)):
+        # The last answer triggers finalizing (streamed LLM call + TTS) in the same rerun
+        name = "smart_talk.finalizing" if question == "q_water" else "smart_talk.gathering"
+        rec.step(at, name, lambda q=question, o=option: at.button(key=f"btn_{q}_{o}").click())
+    if at.session_state["voice_step"] != "done":
+        raise SessionFailure(f"smart_talk stopped at {at.session_state['voice_step']}")
+
+
+def crop_suggestion(rec, session_id):
+    at = _new_app()
+    _select_mode(rec, at, "crop_suggestion", EN["crop_rec"])
+    at.text_input[0].set_value(f"Nashik {session_id % 50}, Maharashtra")
+    rec.step(at, "crop_suggestion.recommend", lambda: _button(at, EN["get_recommendation"]).click())
+
+
+def track_farming(rec, session_id):
+    at = _new_app()
+    _select_mode(rec, at, "track_farming", "Track Farming")
+    at.text_input[0].set_value(f"Farmer {session_id}")
+    at.text_input[1].set_value(f"{session_id % 10000:04d}")
+    rec.step(at, "track_farming.login", lambda: _button(at, "Login / Register").click())
+    if at.text_input and at.text_input[0].label == "Crop Name":
+        at.text_input[0].set_value("Wheat")
+        at.text_input[1].set_value("Pune, Maharashtra")
+        rec.step(at, "track_farming.register", lambda: _button(at, "Start Tracking").click())
+    rec.step(at, "track_farming.advisory", lambda: _button(at, "Generate Today's Advisory").click())
+
+
+SCENARIOS = [smart_talk, crop_suggestion, track_farming]
+
+
+def run_session(rec, session_id):
+    ok = True
+    for scenario in SCENARIOS:
+        try:
+            scenario(rec, session_id)
+        except Exception as e:
+            ok = False
+            with rec.lock:
+                rec.failures[scenario.__name__] += 1
+                rec.messages.append(f"{scenario.__name__} #{session_id}: {e!r}")
+    return ok
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def build_report(rec, sessions, seconds, peak_traced, mock_stats):
+    from utils.metrics import metrics
+
+    steps = {}
+    for name, values in sorted(rec.samples.items()):
+        steps[name] = {
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 0.50) * 1000, 1),
+            "p95_ms": round(_percentile(values, 0.95) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+            "failures": rec.failures.get(name, 0),
+            "app_errors": rec.app_errors.get(name, 0)
+        }
+    reruns = sum(len(values) for values in rec.samples.values())
+    return {
+        "sessions": sessions,
+        "seconds": round(seconds, 2),
+        "sessions_per_second": round(sessions / seconds, 2),
+        "reruns_per_second": round(reruns / seconds, 2),
+        "failed_sessions": rec.failed_sessions,
+        "peak_traced_mb": round(peak_traced / 2 ** 20, 1) if peak_traced is not None else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "steps": steps,
+        "llm": mock_stats,
+        # The app's own hot-path timers (utils.metrics), same process
+        "app_metrics": [
+            {"name": row["name"], "labels": row["labels"], "count": row["count"],
+             "p50": row["p50"], "p95": row["p95"], "max": row["max"]}
+            for row in metrics.snapshot()["series"]
+        ],
+        "sample_errors": rec.messages[:10]
+    }
+
+
+def check_gates(report, args):
+    failures = []
+    total_steps = sum(step["count"] for step in report["steps"].values()) or 1
+    bad = sum(step["failures"] + step["app_errors"] for step in report["steps"].values()) + report["failed_sessions"]
+    if bad / total_steps > args.max_error_rate:
+        failures.append(f"error rate {bad / total_steps:.3f} > {args.max_error_rate}")
+    if args.p95_budget_ms:
+        for name, step in report["steps"].items():
+            if step["p95_ms"] > args.p95_budget_ms:
+                failures.append(f"{name} p95 {step['p95_ms']} ms > {args.p95_budget_ms} ms")
+    if args.max_peak_mb and report["peak_traced_mb"] is not None and report["peak_traced_mb"] > args.max_peak_mb:
+        failures.append(f"peak traced memory {report['peak_traced_mb']} MB > {args.max_peak_mb} MB")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        for name, step in report["steps"].items():
+            before = baseline.get("steps", {}).get(name)
+            if before and step["p95_ms"] > before["p95_ms"] * (1 + args.tolerance):
+                failures.append(f"{name} p95 {step['p95_ms']} ms regressed from {before['p95_ms']} ms")
+    return failures
+
+
+def print_report(report):
+    print(f"\n{report['sessions']} sessions in {report['seconds']}s "
+          f"({report['sessions_per_second']} sessions/s, {report['reruns_per_second']} reruns/s)")
+    print(f"peak memory: traced {report['peak_traced_mb']} MB, RSS {report['peak_rss_mb']} MB")
+    print(f"{'step':34} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'fail':>5} {'err':>5}")
+    for name, step in report["steps"].items():
+        print(f"{name:34} {step['count']:5} {step['p50_ms']:9} {step['p95_ms']:9} {step['max_ms']:9} "
+              f"{step['failures']:5} {step['app_errors']:5}")
+    llm = report["llm"]
+    print(f"LLM mock: {llm['requests']} requests, {llm['prompt_tokens']} prompt + "
+          f"{llm['completion_tokens']} completion tokens, {llm['injected_429']} injected 429s")
+    for message in report["sample_errors"]:
+        print(f"  ! {message}")
+
+
+def prepare_environment(args):
+    """Temp working dir (prompts linked, fresh data/), mock LLM server and stub TTS."""
+    workdir = tempfile.mkdtemp(prefix="farm_load_")
+    os.symlink(os.path.join(REPO_DIR, "prompts"), os.path.join(workdir, "prompts"))
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+
+    from mock_llm_server import start_mock_server
+    server, base_url = start_mock_server(
+        latency=args.latency, chunk_delay=args.chunk_delay, error_429=args.error_429, seed=args.seed
+    )
+    os.environ.update({
+        "GROQ_BASE_URL": base_url,
+        "GROQ_API_KEY": "mock",
+        "LLM_CACHE_ENABLED": "1" if args.llm_cache else "0",
+        # Mock quota is unlimited; keep the scheduler from throttling the test itself
+        "GROQ_RPM": str(args.rpm),
+        "GROQ_TPM": str(args.rpm * 5000),
+    })
+    os.environ.pop("GEMINI_API_KEY", None)
+
+    import gtts
+    StubTTS.delay = args.tts_latency
+    gtts.gTTS = StubTTS
+
+    install_shared_runtime()
+
+    global EN
+    from utils.language_handler import TRANSLATIONS
+    EN = TRANSLATIONS["en"]
+    return workdir, server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive concurrent AppTest sessions through app.py.")
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", default="lognormal:0.3,0.3", help="mock LLM latency distribution")
+    parser.add_argument("--chunk-delay", type=float, default=0.005, help="mock seconds between streamed chunks")
+    parser.add_argument("--error-429", type=float, default=0.0, help="fraction of mock LLM requests rejected")
+    parser.add_argument("--tts-latency", type=float, default=0.05, help="stub gTTS seconds per synthesis")
+    parser.add_argument("--rpm", type=int, default=100000, help="client-side Groq RPM limit during the test")
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache enabled")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip tracemalloc (faster, RSS only)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--report", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier JSON report to compare step p95s against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 regression vs baseline")
+    parser.add_argument("--p95-budget-ms", type=float, default=0, help="fail if any step p95 exceeds this (0 = off)")
+    parser.add_argument("--max-peak-mb", type=float, default=0, help="fail above this traced peak (0 = off)")
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    if args.baseline:
+        args.baseline = os.path.abspath(args.baseline)
+    if args.report:
+        args.report = os.path.abspath(args.report)
+
+    workdir, server = prepare_environment(args)
+    rec = Recorder()
+    try:
+        if not args.no_tracemalloc:
+            tracemalloc.start()
+        # Warm-up: first import of app modules is a cold-start cost, not load behaviour
+        run_session(Recorder(), 9999)
+        server.state.reset()
+        from utils.metrics import metrics
+        metrics.reset()
+        if not args.no_tracemalloc:
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda i: run_session(rec, i), range(args.sessions)))
+        seconds = time.perf_counter() - start
+        rec.failed_sessions = results.count(False)
+
+        peak = tracemalloc.get_traced_memory()[1] if not args.no_tracemalloc else None
+        report = build_report(rec, args.sessions, seconds, peak, server.state.snapshot())
+    finally:
+        server.shutdown()
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failures = check_gates(report, args)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ all gates passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
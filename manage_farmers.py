@@ -0,0 +1,56 @@
+"""
+Bulk import/export of farmer tracking records.
+
+Examples:
+    python manage_farmers.py import coop_farmers.csv --rejects rejects.ndjson
+    python manage_farmers.py import coop_farmers.csv --resume
+    python manage_farmers.py export backup.ndjson
+
+Input columns / keys: farmer_id (4 digits, as at login), crop_name, location, soil_type, fertilizer, plantation_date (YYYY-MM-DD)
+"""
+
+import argparse
+import sys
+import time
+
+from utils.bulk_io import export_records, import_records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export farmer tracking records (NDJSON or CSV).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Stream records from a file into the farmer store")
+    imp.add_argument("path")
+    imp.add_argument("--format", choices=["ndjson", "csv"], help="Default: from file extension")
+    imp.add_argument("--batch-size", type=int, default=1000)
+    imp.add_argument("--checkpoint", help="Progress file (default: <path>.checkpoint)")
+    imp.add_argument("--rejects", help="Write invalid rows and reasons to this NDJSON file")
+    imp.add_argument("--resume", action="store_true", help="Continue after the last committed batch")
+
+    exp = sub.add_parser("export", help="Stream every stored record to a file")
+    exp.add_argument("path")
+    exp.add_argument("--format", choices=["ndjson", "csv"], help="Default: from file extension")
+
+    args = parser.parse_args(argv)
+    start = time.time()
+
+    if args.command == "import":
+        try:
+            stats = import_records(
+                args.path, fmt=args.format, batch_size=args.batch_size,
+                checkpoint_path=args.checkpoint, reject_path=args.rejects, resume=args.resume
+            )
+        except (OSError, ValueError) as e:
+            print(f"Import failed: {e}")
+            return 1
+        print(f"Read {stats['read']} rows: {stats['imported']} imported, {stats['rejected']} rejected "
+              f"({stats['skipped']} rows done by an earlier run) in {time.time() - start:.1f}s")
+    else:
+        count = export_records(args.path, fmt=args.format)
+        print(f"Exported {count} records to {args.path} in {time.time() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
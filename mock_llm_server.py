@@ -0,0 +1,350 @@
+"""
+Local OpenAI-compatible stand-in for Groq, for load tests without spending quota.
+
+Examples:
+    python mock_llm_server.py --port 8787
+    python mock_llm_server.py --latency lognormal:0.6,0.4 --error-429 0.05 --error-503 0.01
+    python mock_llm_server.py --rpm 30 --responses mock_responses.json
+
+Point the app (GroqClient, GroqVisionClient, Whisper transcription) at it with:
+    GROQ_BASE_URL=http://127.0.0.1:8787 GROQ_API_KEY=mock streamlit run app.py
+
+Endpoints (with or without the /openai prefix the Groq SDK uses):
+    POST /openai/v1/chat/completions       text and vision, stream=true sends SSE chunks
+    POST /openai/v1/audio/transcriptions   multipart upload, text or json response
+    GET  /openai/v1/models
+    GET  /stats                            token accounting and injected faults
+    POST /reset                            zero the counters
+
+Latency specs (seconds): fixed:0.2, uniform:0.1,0.8, normal:0.5,0.1, lognormal:MU,SIGMA
+(parameters of the latency itself: median MU), exp:MEAN.
+
+A --responses file is a JSON list of {"match": regex, "response": template} tried
+in order against the last user message; templates may use {prompt}, {model}, {n}.
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+IMAGE_TOKENS = 1500
+DEFAULT_RESPONSE = (
+    "Mock advice ({model}): for \"{prompt}\" keep soil moist, watch for pests and "
+    "follow local agriculture officer guidance. Apply fertilizer in split doses."
+)
+DEFAULT_VISION_RESPONSE = "Mock vision analysis ({model}): leaves show minor spotting; no severe disease visible."
+DEFAULT_TRANSCRIPTION = "mujhe gehun ki kheti ke baare mein jaankari chahiye"
+
+
+def parse_latency(spec):
+    """Sampler returning seconds for a spec like 'lognormal:0.5,0.4'."""
+    kind, _, params = (spec or "fixed:0").partition(":")
+    values = [float(p) for p in params.split(",") if p.strip()] or [0.0]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        mu = math.log(max(values[0], 1e-6))
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def count_tokens(text):
+    """Rough token count (~4 characters per token), same order as the real tokenizer."""
+    return max(1, len(text) // 4) if text else 0
+
+
+class MockState:
+    """Configuration plus thread-safe counters shared by all handler threads."""
+
+    def __init__(self, latency="fixed:0.05", chunk_delay=0.02, error_429=0.0, error_503=0.0,
+                 retry_after=1.0, rpm=0, responses=None, seed=None):
+        self.sample_latency = parse_latency(latency)
+        self.chunk_delay = chunk_delay
+        self.error_429 = error_429
+        self.error_503 = error_503
+        self.retry_after = retry_after
+        self.rpm = rpm
+        self.responses = [(re.compile(r["match"], re.I | re.S), r["response"]) for r in (responses or [])]
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.window = []  # request timestamps for --rpm
+            self.stats = {
+                "requests": 0, "streams": 0, "vision": 0, "transcriptions": 0,
+                "injected_429": 0, "injected_503": 0, "rpm_429": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "by_model": {}
+            }
+
+    def draw(self):
+        """(latency seconds, fault or None) for one request."""
+        with self.lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if self.rpm:
+                self.window = [t for t in self.window if now - t < 60]
+                if len(self.window) >= self.rpm:
+                    self.stats["rpm_429"] += 1
+                    return 0.0, ("429", 60 - (now - self.window[0]))
+                self.window.append(now)
+            roll = self.rng.random()
+            if roll < self.error_429:
+                self.stats["injected_429"] += 1
+                return 0.0, ("429", self.retry_after)
+            if roll < self.error_429 + self.error_503:
+                self.stats["injected_503"] += 1
+                return self.sample_latency(self.rng), ("503", None)
+            return self.sample_latency(self.rng), None
+
+    def account(self, model, prompt_tokens, completion_tokens, kind=None):
+        with self.lock:
+            if kind:
+                self.stats[kind] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+            usage = self.stats["by_model"].setdefault(model, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            usage["requests"] += 1
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.stats))
+
+    def reply(self, prompt, model, vision):
+        for pattern, template in self.responses:
+            if pattern.search(prompt):
+                break
+        else:
+            template = DEFAULT_VISION_RESPONSE if vision else DEFAULT_RESPONSE
+        with self.lock:
+            n = self.stats["requests"]
+        excerpt = " ".join(prompt.split())[:80]
+        return template.format(prompt=excerpt, model=model, n=n)
+
+
+def _message_text(message):
+    """(text, image count) of one chat message; vision content is a list of parts."""
+    content = message.get("content") or ""
+    if isinstance(content, str):
+        return content, 0
+    texts = [part.get("text", "") for part in content if part.get("type") == "text"]
+    images = sum(1 for part in content if part.get("type") == "image_url")
+    return "\n".join(texts), images
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    state = None  # set by make_server
+
+    def log_message(self, *args):
+        pass
+
+    def _route(self):
+        path = self.path.split("?", 1)[0]
+        return path[len("/openai"):] if path.startswith("/openai/") else path
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_fault(self, fault):
+        kind, retry_after = fault
+        if kind == "429":
+            self._send_json(429, {"error": {
+                "message": "Rate limit reached (mock)", "type": "tokens", "code": "rate_limit_exceeded"
+            }}, {"Retry-After": f"{max(retry_after, 0.0):.2f}"})
+        else:
+            self._send_json(503, {"error": {"message": "Service unavailable (mock)", "type": "internal_server_error"}})
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        route = self._route()
+        if route == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [
+                {"id": m, "object": "model", "owned_by": "mock"}
+                for m in ("llama-3.1-8b-instant", "llava-v1.5-7b-4096-preview", "whisper-large-v3")
+            ]})
+        elif route == "/stats":
+            self._send_json(200, self.state.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        route = self._route()
+        body = self._read_body()
+        if route == "/reset":
+            self.state.reset()
+            self._send_json(200, {"ok": True})
+        elif route == "/v1/chat/completions":
+            self._chat(json.loads(body or b"{}"))
+        elif route == "/v1/audio/transcriptions":
+            self._transcription(body)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _chat(self, request):
+        latency, fault = self.state.draw()
+        time.sleep(latency)
+        if fault:
+            return self._send_fault(fault)
+
+        model = request.get("model", "mock")
+        messages = request.get("messages") or []
+        prompt_tokens, images, last_user = 0, 0, ""
+        for message in messages:
+            text, count = _message_text(message)
+            prompt_tokens += count_tokens(text)
+            images += count
+            if message.get("role") == "user":
+                last_user = text
+        prompt_tokens += images * IMAGE_TOKENS
+
+        content = self.state.reply(last_user, model, vision=images > 0)
+        max_tokens = int(request.get("max_tokens") or 1024)
+        words = content.split(" ")
+        finish_reason = "stop"
+        while count_tokens(" ".join(words)) > max_tokens and len(words) > 1:
+            words.pop()
+            finish_reason = "length"
+        content = " ".join(words)
+        completion_tokens = count_tokens(content)
+        self.state.account(model, prompt_tokens, completion_tokens,
+                           "vision" if images else ("streams" if request.get("stream") else None))
+
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        if not request.get("stream"):
+            return self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": finish_reason}],
+                "usage": usage
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(delta, finish=None, extra=None):
+            event = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}], **(extra or {})}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n")
+
+        try:
+            chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                time.sleep(self.state.chunk_delay)
+                chunk({"content": word if i == 0 else " " + word})
+            chunk({}, finish_reason, {"x_groq": {"usage": usage}, "usage": usage})
+            self._write_chunk("data: [DONE]\n\n")
+            self._write_chunk("")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _transcription(self, body):
+        latency, fault = self.state.draw()
+        time.sleep(latency)
+        if fault:
+            return self._send_fault(fault)
+
+        fields = dict(re.findall(rb'name="(\w+)"\r\n\r\n([^\r]*)\r\n', body))
+        model = fields.get(b"model", b"whisper-large-v3").decode()
+        text = DEFAULT_TRANSCRIPTION if fields.get(b"language") == b"hi" else "I need information about wheat farming"
+        self.state.account(model, 0, count_tokens(text), "transcriptions")
+
+        if fields.get(b"response_format", b"json") == b"text":
+            payload = text.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        else:
+            self._send_json(200, {"text": text})
+
+
+def make_server(host="127.0.0.1", port=8787, **config):
+    """Build (not start) a mock server; config goes to MockState. Returns (server, base_url)."""
+    state = MockState(**config)
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server, f"http://{host}:{server.server_port}"
+
+
+def start_mock_server(**config):
+    """Serve on a background thread (port 0 picks a free port). Returns (server, base_url)."""
+    config.setdefault("port", 0)
+    server, base_url = make_server(**config)
+    threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True).start()
+    return server, base_url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock of the Groq API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", default="fixed:0.05", help="time to first byte distribution (see module doc)")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--error-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--error-503", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--rpm", type=int, default=0, help="enforce a requests-per-minute limit (0 = off)")
+    parser.add_argument("--responses", help="JSON file of canned responses")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    responses = None
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as f:
+            responses = json.load(f)
+
+    server, base_url = make_server(
+        args.host, args.port, latency=args.latency, chunk_delay=args.chunk_delay,
+        error_429=args.error_429, error_503=args.error_503, retry_after=args.retry_after,
+        rpm=args.rpm, responses=responses, seed=args.seed
+    )
+    print(f"Mock LLM server on {base_url}  (GROQ_BASE_URL={base_url} GROQ_API_KEY=mock)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.state.snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import hmac
+import os
+
+import streamlit as st
+
+from utils.metrics import metrics
+
+# Admin page: live latency percentiles for this server process.
+# Closed unless METRICS_ADMIN_TOKEN is set; the token is asked for before anything is shown.
+
+st.set_page_config(page_title="Metrics", layout="wide", page_icon="📊")
+st.title("📊 Live Metrics")
+
+token = os.getenv("METRICS_ADMIN_TOKEN")
+if not token:
+    st.warning("This page is disabled. Set METRICS_ADMIN_TOKEN on the server to enable it.")
+    st.stop()
+if not hmac.compare_digest(st.text_input("Admin token", type="password").encode("utf-8"), token.encode("utf-8")):
+    st.info("Enter the admin token to view metrics.")
+    st.stop()
+
+refresh = st.sidebar.select_slider("Refresh every (s)", options=[2, 5, 10, 30, 60], value=5)
+if st.sidebar.button("Reset metrics"):
+    metrics.reset()
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 1)
+
+
+@st.fragment(run_every=refresh)
+def live_metrics():
+    snap = metrics.snapshot()
+    timers = [row for row in snap["series"] if row["name"].endswith("_seconds")]
+    sizes = [row for row in snap["series"] if not row["name"].endswith("_seconds")]
+
+    st.subheader("Timings (ms)")
+    if timers:
+        st.dataframe([{
+            "metric": row["name"][:-len("_seconds")],
+            **row["labels"],
+            "count": row["count"],
+            "p50": _ms(row["p50"]),
+            "p95": _ms(row["p95"]),
+            "p99": _ms(row["p99"]),
+            "max": _ms(row["max"]),
+        } for row in timers], use_container_width=True)
+    else:
+        st.caption("No samples yet. Use the app and this page will fill in.")
+
+    if sizes:
+        st.subheader("Sizes")
+        st.dataframe([{
+            "metric": row["name"], **row["labels"], "count": row["count"],
+            "p50": row["p50"], "p95": row["p95"], "max": row["max"],
+        } for row in sizes], use_container_width=True)
+
+    if snap["counters"]:
+        st.subheader("Counters")
+        st.dataframe([{"metric": row["name"], **row["labels"], "value": row["value"]}
+                      for row in snap["counters"]], use_container_width=True)
+
+    from utils.llm_groq_client import groq_client
+    from utils.rate_limiter import groq_scheduler
+    from utils.tts_backends import tts_router
+    from utils.tts_cache import audio_cache
+    col1, col2, col3 = st.columns(3)
+    col1.write("**LLM cache**")
+    col1.json(groq_client.cache_stats())
+    col2.write("**Groq rate limiter**")
+    col2.json(dict(groq_scheduler.stats))
+    col3.write("**TTS audio cache**")
+    col3.json(dict(audio_cache.stats))
+    col3.write("**TTS backends**")
+    col3.json(tts_router.stats())
+
+    with st.expander("Prometheus text"):
+        st.code(metrics.render_prometheus(), language="text")
+
+
+live_metrics()
@@ -0,0 +1,40 @@
+"""
+Nightly Track Farming advisory job.
+
+Examples:
+    python run_nightly_advisories.py
+    python run_nightly_advisories.py --lang hi --date 2026-10-18
+
+Advisories are stored in the farmer store for instant display in Track Farming.
+Rerunning for the same date and language resumes from the checkpoint and skips
+farmers whose inputs have not changed.
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import date
+
+from utils.advisory_batch import run_nightly_advisories
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate daily advisories for every tracked farmer.")
+    parser.add_argument("--date", type=date.fromisoformat, help="Run date YYYY-MM-DD (default: today)")
+    parser.add_argument("--lang", choices=["en", "hi"], default="en")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: data/advisory_checkpoint_<date>_<lang>.json)")
+    parser.add_argument("--output", help="Also write {farmer_id, date, advisory} rows to this NDJSON file")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    report = run_nightly_advisories(
+        today=args.date, lang=args.lang, checkpoint_path=args.checkpoint, output_path=args.output
+    )
+    report["seconds"] = round(time.time() - start, 1)
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed_contexts"] or report["farmers_without_advisory"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
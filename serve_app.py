@@ -0,0 +1,17 @@
+"""
+Run the app with its audio endpoint.
+
+Examples:
+    streamlit run serve_app.py
+    uvicorn serve_app:app --host 0.0.0.0 --port 8501
+
+Same app as `streamlit run app.py`, plus GET /audio/<hash>.<ext>, which serves
+synthesised speech from the TTS cache with browser cache headers. Without it the
+app still works, but every clip is sent inline through the websocket as base64.
+"""
+
+import streamlit as st
+
+from utils.audio_media import audio_routes
+
+app = st.App("app.py", routes=audio_routes())
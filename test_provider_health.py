@@ -0,0 +1,127 @@
+"""
+Test the circuit breaker (utils/provider_health.py) and the LLM and TTS routers on
+top of it with fake providers (no network needed). Checks the breaker states, that
+ranking never claims a half-open probe, failover, hedging and streamed failover.
+"""
+
+import time
+
+from utils.llm_groq_client import GroqStreamError
+from utils.llm_router import LLMRouter, Provider
+from utils.provider_health import FAILURE_THRESHOLD, ProviderStats
+from utils.tts_backends import TTSBackend, TTSRouter
+
+COOLDOWN = 0.2
+
+
+class FakeClient:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def get_completion(self, prompt, system_instruction=None, temperature=0.7, max_tokens=1024):
+        self.calls += 1
+        time.sleep(self.delay)
+        return f"Error: {self.error}" if self.error else "answer"
+
+    def stream_completion(self, prompt, system_instruction=None, temperature=0.7, max_tokens=1024):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise GroqStreamError(self.error)
+        yield "ans"
+        yield "wer"
+
+
+class FakeVoice(TTSBackend):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.stats.cooldown_seconds = COOLDOWN
+        self.calls = 0
+
+    def available(self, lang):
+        return True
+
+    def synthesize(self, text, lang):
+        self.calls += 1
+        return b"audio"
+
+
+def make_router(*clients, streams=False):
+    providers = []
+    for i, client in enumerate(clients):
+        provider = Provider(f"p{i}", "fake", lambda client=client: client, streams=streams)
+        provider.stats.cooldown_seconds = COOLDOWN
+        providers.append(provider)
+    return LLMRouter(providers)
+
+
+def trip(stats):
+    for _ in range(FAILURE_THRESHOLD):
+        stats.record(0.01, False)
+
+
+def test_provider_health():
+    print("[1] Breaker opens, cools down and lets one probe through")
+    stats = ProviderStats(COOLDOWN)
+    trip(stats)
+    assert stats.state == "open" and not stats.available() and not stats.allow()
+    time.sleep(COOLDOWN)
+    assert stats.available() and stats.available(), "available() must not claim the probe"
+    assert stats.allow() and stats.state == "half_open"
+    assert not stats.available() and not stats.allow(), "second probe let through"
+    stats.record(0.01, True)
+    assert stats.state == "closed" and stats.allow() and stats.allow()
+    print("✅ closed -> open -> half_open (one probe) -> closed")
+
+    print("[2] Ranking a half-open provider does not lock it out")
+    primary, backup = FakeClient(), FakeClient()
+    router = make_router(primary, backup)
+    trip(router.providers[1].stats)
+    time.sleep(COOLDOWN)
+    assert router.get_completion("q") == "answer" and backup.calls == 0
+    primary.error = "down"
+    assert router.get_completion("q") == "answer", "did not fail over to the half-open provider"
+    assert backup.calls == 1 and router.providers[1].stats.state == "closed"
+    print("✅ failed over to the recovered provider")
+
+    print("[3] Slow primary is hedged")
+    slow, fast = FakeClient(delay=1.0), FakeClient(delay=0.05)
+    router = make_router(slow, fast)
+    for provider in router.providers:
+        for _ in range(5):
+            provider.stats.record(0.1, True)
+    start = time.monotonic()
+    assert router.get_completion("q") == "answer" and fast.calls == 1
+    assert time.monotonic() - start < 0.8
+    print(f"✅ answered in {time.monotonic() - start:.2f}s")
+
+    print("[4] Streams fail over before the first chunk")
+    broken, working = FakeClient(error="boom"), FakeClient()
+    router = make_router(broken, working, streams=True)
+    assert "".join(router.stream_completion("q")) == "answer" and working.calls == 1
+    router = make_router(FakeClient(error="boom"), streams=True)
+    try:
+        list(router.stream_completion("q"))
+        raise AssertionError("expected GroqStreamError")
+    except GroqStreamError:
+        pass
+    print("✅ failover, and GroqStreamError when every provider fails")
+
+    print("[5] A recovered TTS backend gets its probe even after cache lookups rank it")
+    gtts, espeak = FakeVoice("gtts"), FakeVoice("espeak-ng")
+    tts = TTSRouter([gtts, espeak])
+    trip(gtts.stats)
+    assert tts.synthesize("hi", "en")[0] is espeak
+    time.sleep(COOLDOWN)
+    tts.ranked("en")  # what the audio cache does before synthesising
+    assert tts.synthesize("hi", "en")[0] is gtts and gtts.stats.state == "closed"
+    print("✅ gTTS back in use after one cooldown")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_provider_health()
+    exit(0 if success else 1)
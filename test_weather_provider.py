@@ -0,0 +1,102 @@
+"""
+Test the weather provider layer against a local stub HTTP server (no internet needed).
+Checks bucketing, TTL caching, coalescing of concurrent lookups, batch refresh and
+the rain outlook / weather signature used in stored-advisory hashes.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from utils.advisory_batch import weather_signature
+from utils.weather_provider import OpenMeteoProvider, WeatherService, bucket_location, rain_outlook
+
+REQUESTS = {"geocode": 0, "forecast": 0}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/geocode":
+            REQUESTS["geocode"] += 1
+            body = {"results": [{"latitude": 18.5, "longitude": 73.85}]} if query["name"][0] != "atlantis" else {}
+        else:
+            REQUESTS["forecast"] += 1
+            time.sleep(0.2)  # slow upstream so concurrent lookups overlap
+            body = {
+                "current": {"temperature_2m": 31.4, "relative_humidity_2m": 55, "weather_code": 61},
+                "daily": {"precipitation_sum": [2.0, 5.5, 0]}
+            }
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_weather_provider():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        print("[1] Bucketing")
+        assert bucket_location("Khed, Pune, Maharashtra") == bucket_location("Hadapsar,  pune") == "district:pune"
+        assert bucket_location("18.52, 73.86") == bucket_location("18.49,73.80") == "grid:18.50,73.75"
+        print("✅ district and grid buckets")
+
+        provider = OpenMeteoProvider(forecast_url=f"{base}/forecast", geocoding_url=f"{base}/geocode")
+        service = WeatherService(provider=provider, ttl=60, max_buckets=2)
+
+        print("[2] Concurrent lookups for one bucket are coalesced")
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            results = list(pool.map(service.get, ["Village %d, Pune" % i for i in range(20)]))
+        assert REQUESTS["forecast"] == 1, REQUESTS
+        assert results[0] == {"temp": "31°C", "condition": "Rain", "humidity": "55%",
+                              "forecast": "About 8 mm rain expected in next 3 days", "rain_mm": 7.5}, results[0]
+        print(f"✅ 20 lookups -> {REQUESTS['forecast']} forecast request")
+
+        print("[3] Cached within TTL, LRU cap respected")
+        service.get("Pune")
+        assert REQUESTS["forecast"] == 1
+        service.get_many(["A, Nashik", "B, Nashik", "C, Satara", "Pune"])
+        assert len(service._cache) == 2, len(service._cache)
+        print(f"✅ stats {service.stats}")
+
+        print("[4] Batch refresh fetches each bucket once")
+        before = REQUESTS["forecast"]
+        assert service.refresh(["A, Nashik", "B, Nashik", "C, Satara", "D, Satara"]) == 2
+        assert REQUESTS["forecast"] - before == 2
+        print("✅ 4 locations -> 2 forecast requests")
+
+        print("[5] Failures fall back without caching")
+        assert service.get("atlantis")["condition"] == "Unavailable"
+        print("✅ unavailable placeholder returned")
+
+        print("[6] Rain outlook and weather signature ignore live readings")
+        assert [rain_outlook({"rain_mm": mm}) for mm in (0, 0.9, 1, 9.9, 10, 39.9, 40, 120)] == [
+            "dry", "dry", "light rain", "light rain", "moderate rain", "moderate rain", "heavy rain", "heavy rain"]
+        assert rain_outlook({"rain_mm": None, "forecast": "  No Rain  expected"}) == "no rain expected"
+        morning = {"temp": "24°C", "humidity": "80%", "condition": "Rain", "rain_mm": 7.5, "forecast": "x"}
+        evening = {"temp": "31°C", "humidity": "55%", "condition": "Rain", "rain_mm": 2.0, "forecast": "y"}
+        assert weather_signature("Khed, Pune", morning) == weather_signature("Hadapsar, pune", evening) \
+            == "district:pune|light rain"
+        assert weather_signature("Khed, Pune", morning) != weather_signature("Khed, Pune", {**morning, "rain_mm": 15})
+        assert weather_signature("Khed, Pune", morning) != weather_signature("Khed, Nashik", morning)
+        print("✅ same bucket and rain band -> same signature")
+        return True
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    success = test_weather_provider()
+    exit(0 if success else 1)
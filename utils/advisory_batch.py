@@ -0,0 +1,273 @@
+"""
+Nightly batch generation of Track Farming advisories.
+Farmers whose normalised prompt context (crop, stage, soil, fertilizer, weather,
+language) matches share one LLM call; the result is fanned out to all of them.
+Completed contexts are checkpointed so an interrupted run resumes without
+paying for the same calls again.
+
+Results are materialised per (farmer_id, date, language) in the farmer store
+together with a hash of the prompt inputs, so the app can show them instantly
+and farmers whose inputs have not changed are skipped.
+"""
+
+import hashlib
+import json
+import os
+from datetime import date, timedelta
+
+from utils.farmer_store import farmer_store
+from utils.llm_groq_client import groq_client, is_error_response
+from utils.prompt_registry import prompt_registry
+from utils.rate_limiter import background_priority
+from utils.token_budget import llm_mode, plan_prompt
+from utils.tracking_logic import CROP_KEYS, bulk_crop_stages
+from utils.weather_provider import bucket_location, rain_outlook, weather_service
+
+CHUNK_SIZE = 10000
+# Materialised advisories older than this are pruned by the nightly run
+KEEP_DAYS = 7
+
+
+def _read_prompt(filename):
+    return prompt_registry.text(filename)
+
+
+def _norm(value):
+    return " ".join(str(value or "").split()).lower()
+
+
+def format_weather(weather):
+    return f"{weather['temp']}, {weather['condition']}, {weather['forecast']}"
+
+
+def weather_signature(location, weather):
+    """
+    The weather part of a context key: the location's weather bucket and its rain
+    outlook. Live readings (temperature, humidity) are left out, so the key computed
+    at login matches the nightly one for the whole day.
+    """
+    return f"{bucket_location(location)}|{rain_outlook(weather)}"
+
+
+def context_key(crop_key, stage, soil_type, fertilizer, weather_sig, lang):
+    """Stable hash of the inputs that decide the advisory text (weather_sig from weather_signature)."""
+    parts = [crop_key, stage, _norm(soil_type), _norm(fertilizer), weather_sig, lang]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:24]
+
+
+def advisory_inputs_hash(key, record):
+    """
+    Hash deciding whether a stored advisory is still valid for a farmer:
+    the shared context (stage, weather bucket forecast, ...) plus the farmer's own record.
+    """
+    canonical = json.dumps(dict(record), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{key}\x1f{canonical}".encode("utf-8")).hexdigest()[:24]
+
+
+def _chunk_weather(locations, weather_by_bucket):
+    """location -> weather; buckets already in weather_by_bucket are reused, new ones fetched and added."""
+    if weather_by_bucket is None:
+        return weather_service.get_many(locations)
+    buckets = {location: bucket_location(location) for location in set(locations)}
+    missing = {}
+    for location, bucket in buckets.items():
+        if bucket not in weather_by_bucket:
+            missing.setdefault(bucket, location)
+    if missing:
+        fetched = weather_service.get_many(list(missing.values()))
+        for bucket, location in missing.items():
+            weather_by_bucket[bucket] = fetched[location]
+    return {location: weather_by_bucket[bucket] for location, bucket in buckets.items()}
+
+
+def iter_farmer_contexts(today=None, lang="en", chunk_size=CHUNK_SIZE, weather_by_bucket=None):
+    """
+    Walk every tracked farmer in chunks, yielding (farmer_id, key, context).
+    Ages and stages are computed per chunk with bulk_crop_stages.
+    Pass the same weather_by_bucket dict to several walks to compute every key
+    from the same forecast, even if the weather cache refreshes in between.
+    """
+    chunk = []
+
+    def process(chunk):
+        stages = bulk_crop_stages(
+            [rec.get("crop_name", "") for _, rec in chunk],
+            [rec.get("plantation_date", "") for _, rec in chunk],
+            today=today
+        )
+        # One lookup per weather bucket for the whole chunk
+        weather = _chunk_weather([rec.get("location", "") for _, rec in chunk], weather_by_bucket)
+        for i, (farmer_id, rec) in enumerate(chunk):
+            crop_key = CROP_KEYS[stages.crop_index[i]]
+            stage = stages.stage_names[i]
+            location_weather = weather[rec.get("location", "")]
+            weather_text = format_weather(location_weather)
+            key = context_key(crop_key, stage, rec.get("soil_type"), rec.get("fertilizer"),
+                              weather_signature(rec.get("location", ""), location_weather), lang)
+            yield farmer_id, key, {
+                "crop_name": crop_key,
+                "stage": stage,
+                "age": int(stages.ages[i]),
+                "location": rec.get("location", ""),
+                "soil_type": rec.get("soil_type", ""),
+                "fertilizer": rec.get("fertilizer", ""),
+                "weather": weather_text,
+                "input_hash": advisory_inputs_hash(key, rec)
+            }
+
+    for item in farmer_store.iter_all():
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield from process(chunk)
+            chunk = []
+    if chunk:
+        yield from process(chunk)
+
+
+def _group_prompt(group, lang):
+    """Plan the tracking_prompt.txt request for a whole group of farmers."""
+    ages = group["age_min"] if group["age_min"] == group["age_max"] else f"{group['age_min']}-{group['age_max']}"
+    return plan_prompt(
+        "tracking", _read_prompt("system_prompt.txt"), _read_prompt("tracking_prompt.txt"), lang,
+        crop_name=group["crop_name"],
+        plantation_date="Varies (grouped advisory)",
+        age=ages,
+        stage=group["stage"],
+        location=group["location"] or "Multiple farms with the same weather outlook",
+        soil_type=group["soil_type"],
+        fertilizer=group["fertilizer"],
+        weather=group["weather"]
+    )
+
+
+def _load_checkpoint(path, run_id):
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("run_id") == run_id:
+            return checkpoint
+    return {"run_id": run_id, "results": {}}
+
+
+def _save_checkpoint(path, checkpoint):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _is_up_to_date(farmer_id, today, lang, input_hash):
+    stored = farmer_store.get_advisory(farmer_id, today, lang)
+    return stored is not None and stored[0] == input_hash
+
+
+def run_nightly_advisories(today=None, lang="en", checkpoint_path=None, output_path=None, client=None):
+    """
+    Generate and store advisories for every tracked farmer.
+
+    Args:
+        today: run date (defaults to date.today())
+        lang: 'en' or 'hi'
+        checkpoint_path: per-context results so far (default: data/advisory_checkpoint_<date>_<lang>.json)
+        output_path: optional NDJSON copy of {farmer_id, date, advisory}
+        client: object with get_completion(prompt, system_instruction=..., max_tokens=...) (default: groq_client)
+
+    Returns:
+        report dict (farmers, unique contexts, LLM calls made/reused/failed, farmers left
+        without an advisory, calls saved)
+    """
+    today = today or date.today()
+    client = client or groq_client
+    run_id = f"{today}_{lang}"
+    checkpoint_path = checkpoint_path or f"data/advisory_checkpoint_{run_id}.json"
+
+    # Pass 1: collect unique contexts of farmers needing a new advisory
+    # (memory grows with contexts and weather buckets, not farmers)
+    groups = {}
+    farmers = 0
+    up_to_date = 0
+    # Pass 3 rebuilds the keys from this snapshot; fresh weather would change them
+    weather_by_bucket = {}
+    for farmer_id, key, ctx in iter_farmer_contexts(today, lang, weather_by_bucket=weather_by_bucket):
+        farmers += 1
+        if _is_up_to_date(farmer_id, today, lang, ctx["input_hash"]):
+            up_to_date += 1
+            continue
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {**ctx, "count": 1, "age_min": ctx["age"], "age_max": ctx["age"]}
+            continue
+        group["count"] += 1
+        group["age_min"] = min(group["age_min"], ctx["age"])
+        group["age_max"] = max(group["age_max"], ctx["age"])
+        if group["location"] and _norm(group["location"]) != _norm(ctx["location"]):
+            group["location"] = ""
+
+    # Pass 2: one LLM call per unique context not already in the checkpoint
+    checkpoint = _load_checkpoint(checkpoint_path, run_id)
+    results = checkpoint["results"]
+    calls, reused, failed = 0, 0, 0
+
+    for key, group in groups.items():
+        if key in results:
+            reused += 1
+            continue
+        # Yield the shared Groq quota to live farmers
+        request = _group_prompt(group, lang)
+        with background_priority(), llm_mode("tracking_batch"):
+            advisory = client.get_completion(request.prompt, system_instruction=request.system,
+                                             max_tokens=request.max_tokens)
+        calls += 1
+        if is_error_response(advisory):
+            failed += 1
+            print(f"Advisory failed for {group['crop_name']} / {group['stage']}: {advisory}")
+            continue
+        results[key] = advisory
+        _save_checkpoint(checkpoint_path, checkpoint)
+
+    # Pass 3: fan results out to every farmer in each group
+    delivered = 0
+    undelivered = 0
+    rows = []
+    out = open(f"{output_path}.tmp", "w", encoding="utf-8") if output_path else None
+    try:
+        for farmer_id, key, ctx in iter_farmer_contexts(today, lang, weather_by_bucket=weather_by_bucket):
+            if _is_up_to_date(farmer_id, today, lang, ctx["input_hash"]):
+                continue
+            if key not in results:
+                # Failed context, or a farmer added or edited since pass 1
+                undelivered += 1
+                continue
+            rows.append((farmer_id, today, lang, ctx["input_hash"], results[key]))
+            if out:
+                out.write(json.dumps({"farmer_id": farmer_id, "date": str(today), "advisory": results[key]},
+                                     ensure_ascii=False) + "\n")
+            if len(rows) >= CHUNK_SIZE:
+                farmer_store.put_advisories(rows)
+                delivered += len(rows)
+                rows = []
+        if rows:
+            farmer_store.put_advisories(rows)
+            delivered += len(rows)
+    finally:
+        if out:
+            out.close()
+    if output_path:
+        os.replace(f"{output_path}.tmp", output_path)
+
+    pruned = farmer_store.prune_advisories(today - timedelta(days=KEEP_DAYS))
+
+    return {
+        "date": str(today),
+        "lang": lang,
+        "farmers": farmers,
+        "already_up_to_date": up_to_date,
+        "unique_contexts": len(groups),
+        "llm_calls": calls,
+        "reused_from_checkpoint": reused,
+        "failed_contexts": failed,
+        "advisories_stored": delivered,
+        "farmers_without_advisory": undelivered,
+        "calls_saved_by_dedup": farmers - up_to_date - len(groups),
+        "old_advisories_pruned": pruned
+    }
@@ -0,0 +1,124 @@
+"""
+Compact delivery of synthesised speech.
+
+- Clips are re-encoded once, when they are made, into a low-bitrate speech format
+  (mono MP3 at TTS_AUDIO_BITRATE, or Opus) when ffmpeg is available. gTTS already
+  produces low-bitrate MP3; local engines produce uncompressed WAV.
+- audio_routes() adds GET /audio/<content hash>.<ext>, which serves clips straight
+  from the TTS cache with immutable cache headers (the name is the content, so a
+  URL never changes meaning). The browser fetches each clip once and replays it
+  from its own cache; nothing goes through the Streamlit websocket.
+- Without the route (plain `streamlit run app.py`, AppTest) clips fall back to
+  inline data: URIs.
+
+Run with the route:
+    streamlit run serve_app.py        (or: uvicorn serve_app:app)
+
+Configuration (environment):
+    TTS_AUDIO_CODEC     mp3 (default), opus, or none to keep what the engine produced
+    TTS_AUDIO_BITRATE   target bitrate (default 32k)
+    FFMPEG_BIN          ffmpeg binary (default: ffmpeg on PATH)
+"""
+
+import base64
+import os
+import re
+import shutil
+import subprocess
+
+from utils.metrics import metrics
+from utils.tts_cache import AUDIO_FORMATS, audio_cache, audio_format
+
+CODEC = os.getenv("TTS_AUDIO_CODEC", "mp3").lower()
+BITRATE = os.getenv("TTS_AUDIO_BITRATE", "32k")
+FFMPEG = os.getenv("FFMPEG_BIN") or shutil.which("ffmpeg")
+
+AUDIO_ROUTE = "/audio"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# codec -> (ffmpeg arguments, mime type it produces)
+ENCODERS = {
+    "mp3": (["-c:a", "libmp3lame", "-ar", "22050", "-f", "mp3"], "audio/mpeg"),
+    "opus": (["-c:a", "libopus", "-application", "voip", "-f", "ogg"], "audio/ogg"),
+}
+
+MIME_TYPES = {"mp3": "audio/mpeg", **{ext: mime for _, mime, ext in AUDIO_FORMATS}}
+
+_CLIP_NAME = re.compile(r"^([0-9a-f]{64})\.(mp3|ogg|wav|aiff)$")
+
+_serving = False  # set once audio_routes() has been mounted
+
+
+def compress_audio(data):
+    """data re-encoded as CODEC at BITRATE; unchanged if it already is, without ffmpeg, or on failure."""
+    encoder = ENCODERS.get(CODEC)
+    if encoder is None or not FFMPEG or not data:
+        return data
+    args, mime = encoder
+    if audio_format(data)[0] == mime:
+        return data  # re-encoding lossy audio at the same rate only loses quality
+    with metrics.timer("tts_encode", codec=CODEC) as span:
+        try:
+            result = subprocess.run(
+                [FFMPEG, "-hide_banner", "-loglevel", "error", "-i", "pipe:0", "-ac", "1", "-b:a", BITRATE, *args,
+                 "pipe:1"],
+                input=data, capture_output=True, timeout=30,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            span.label(outcome="error")
+            span.set(error=str(e))
+            return data
+        if result.returncode != 0 or not result.stdout:
+            span.label(outcome="error")
+            span.set(error=result.stderr.decode("utf-8", "replace")[:200])
+            return data
+        span.set(bytes_in=len(data), bytes_out=len(result.stdout))
+        return result.stdout
+
+
+def is_serving():
+    return _serving and audio_cache.enabled
+
+
+def audio_src(key, data):
+    """URL the browser should play: /audio/<key>.<ext> when the route is mounted, else a data: URI."""
+    mime, ext = audio_format(data)
+    if is_serving():
+        metrics.inc("tts_clips_delivered", delivery="reference")
+        return f"{AUDIO_ROUTE}/{key}.{ext}"
+    metrics.inc("tts_clips_delivered", delivery="inline")
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+def audio_routes():
+    """Starlette routes serving cached clips by content hash (pass to st.App(routes=...))."""
+    global _serving
+    from starlette.responses import FileResponse, Response
+    from starlette.routing import Route
+
+    async def clip(request):
+        match = _CLIP_NAME.match(request.path_params["name"])
+        if not match:
+            return Response(status_code=404)
+        key, ext = match.groups()
+        # The URL names one encoding: a clip stored in another one is a 404, not that file
+        headers = {"Cache-Control": CACHE_CONTROL, "ETag": f'"{key}.{ext}"'}
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        path = audio_cache.find_path(key)
+        if path is not None and path.rsplit(".", 1)[-1] != ext:
+            metrics.inc("tts_audio_requests", source="wrong_extension")
+            return Response(status_code=404)
+        if path is not None:
+            metrics.inc("tts_audio_requests", source="disk")
+            # FileResponse answers Range requests, which Safari needs for <audio>
+            return FileResponse(path, media_type=MIME_TYPES[path.rsplit(".", 1)[-1]], headers=headers)
+        data = audio_cache.get(key)  # memory tier only (disk write failed or is disabled)
+        if data is None or audio_format(data)[1] != ext:
+            metrics.inc("tts_audio_requests", source="missing")
+            return Response(status_code=404)
+        metrics.inc("tts_audio_requests", source="memory")
+        return Response(data, media_type=audio_format(data)[0], headers=headers)
+
+    _serving = True
+    return [Route(AUDIO_ROUTE + "/{name}", clip, methods=["GET"])]
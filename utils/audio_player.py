@@ -0,0 +1,50 @@
+import json
+
+import streamlit as st
+
+# One player on the page plays the clips of an utterance in order, whichever
+# snippet runs first. A new utterance stops the previous one, like a rerun replacing
+# an <audio autoplay> element did.
+_PLAYER_JS = """
+<script>
+    (() => {
+        // Scoped: every clip's snippet runs in the same page
+        const w = window;
+        const p = w.__kisanTts = w.__kisanTts || {id: null, clips: {}, next: 0, audio: null};
+        const utterance = %(utterance)s;
+        if (p.id !== utterance) {
+            if (p.audio) p.audio.pause();
+            p.id = utterance; p.clips = {}; p.next = 0; p.audio = null;
+        }
+        p.clips[%(index)d] = %(src)s;
+        function playNext() {
+            if (p.audio || !(p.next in p.clips)) return;
+            const audio = new w.Audio(p.clips[p.next]);
+            delete p.clips[p.next];
+            p.next += 1;
+            p.audio = audio;
+            const done = () => { if (p.audio === audio) { p.audio = null; playNext(); } };
+            audio.onended = done;
+            audio.onerror = done;
+            audio.play().catch(done);
+        }
+        playNext();
+    })();
+</script>
+"""
+
+
+def _js_string(value):
+    # JSON, with "</" escaped so a value can never close the <script> tag
+    return json.dumps(value).replace("</", "<\\/")
+
+
+def queue_audio_clip(src, utterance, index):
+    """
+    Queue one clip of an utterance for playback in the browser.
+    src is any URL the browser can play (a data: URI works); clips of the same
+    utterance play back to back in index order.
+    """
+    html = _PLAYER_JS % {"utterance": _js_string(utterance), "index": index, "src": _js_string(src)}
+    # Not iframed: the script runs in the app page itself
+    st.html(html, unsafe_allow_javascript=True)
@@ -0,0 +1,230 @@
+"""
+Streaming bulk import/export of farmer tracking records (NDJSON or CSV).
+Rows are validated one at a time and written in batches, so memory use does
+not depend on file size. Imports checkpoint after every committed batch
+(counters and byte offset included) and can resume after an interruption
+without re-reading the rows already done.
+"""
+
+import csv
+import json
+import os
+import re
+from datetime import date, datetime
+
+from utils.data_handler import invalidate_cache
+from utils.farmer_store import farmer_store
+
+FIELDS = ["farmer_id", "crop_name", "location", "soil_type", "fertilizer", "plantation_date"]
+
+# Same choices as the Track Farming registration form
+SOIL_TYPES = ["Clay", "Sandy", "Loamy", "Black", "Red"]
+FERTILIZERS = ["Urea", "DAP", "Organic", "Mixed", "Not Sure"]
+
+# Same format the Track Farming login accepts, so every imported farmer can log in
+FARMER_ID_PATTERN = re.compile(r"^\d{4}$")
+
+
+def detect_format(path):
+    """'csv' or 'ndjson' from the file extension."""
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def _choice(value, options, field):
+    for option in options:
+        if value.lower() == option.lower():
+            return option
+    raise ValueError(f"{field} must be one of {', '.join(options)} (got '{value}')")
+
+
+def validate_row(row, today=None):
+    """
+    Validate one input row.
+
+    Returns:
+        (farmer_id, record) ready for the store
+    Raises:
+        ValueError describing the first problem found
+    """
+    today = today or date.today()
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object with farmer fields")
+    values = {field: str(row.get(field) or "").strip() for field in FIELDS}
+
+    if not FARMER_ID_PATTERN.match(values["farmer_id"]):
+        raise ValueError(f"farmer_id must be 4 digits (got '{values['farmer_id']}')")
+    for field in ("crop_name", "location"):
+        if not values[field]:
+            raise ValueError(f"{field} is required")
+
+    try:
+        p_date = datetime.strptime(values["plantation_date"], "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"plantation_date must be YYYY-MM-DD (got '{values['plantation_date']}')")
+    if p_date > today:
+        raise ValueError(f"plantation_date {p_date} is in the future")
+
+    record = {
+        "crop_name": values["crop_name"],
+        "location": values["location"],
+        "soil_type": _choice(values["soil_type"], SOIL_TYPES, "soil_type"),
+        "fertilizer": _choice(values["fertilizer"] or "Not Sure", FERTILIZERS, "fertilizer"),
+        "plantation_date": str(p_date)
+    }
+    return values["farmer_id"], record
+
+
+def iter_rows(path, fmt=None, offset=0, rows_before=0):
+    """
+    Yield (row_number, row_dict, end_offset) from an NDJSON or CSV file, one line at a time.
+    end_offset is the byte position after the row; pass it back as offset (with the
+    row count so far as rows_before) to continue from there without re-reading.
+    """
+    fmt = fmt or detect_format(path)
+    with open(path, "rb") as f:
+        position = 0
+
+        def lines():
+            nonlocal position
+            for raw in iter(f.readline, b""):
+                position = f.tell()
+                yield raw.decode("utf-8-sig")
+
+        if fmt == "csv":
+            reader = csv.DictReader(lines())
+            # The header is always read from the top; data rows continue at offset
+            reader.fieldnames
+            if offset:
+                f.seek(offset)
+            for row_number, row in enumerate(reader, start=rows_before + 1):
+                yield row_number, row, position
+        else:
+            if offset:
+                f.seek(offset)
+            for row_number, line in enumerate(lines(), start=rows_before + 1):
+                line = line.strip()
+                if not line:
+                    yield row_number, None, position
+                    continue
+                try:
+                    yield row_number, json.loads(line), position
+                except json.JSONDecodeError as e:
+                    yield row_number, ValueError(f"invalid JSON: {e}"), position
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _source_fingerprint(path):
+    st = os.stat(path)
+    return {"source": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def import_records(path, fmt=None, batch_size=1000, checkpoint_path=None, reject_path=None, resume=False):
+    """
+    Stream records from path into the farmer store.
+
+    Args:
+        path: NDJSON or CSV file
+        fmt: 'ndjson' or 'csv' (default: from extension)
+        batch_size: rows per transaction
+        checkpoint_path: progress file (default: <path>.checkpoint)
+        reject_path: invalid rows are appended here as NDJSON with the reason
+        resume: continue after the rows already committed according to the checkpoint
+
+    Returns:
+        dict with rows read, imported and rejected over the whole file (a resumed
+        import includes the earlier runs), and skipped: rows done before this run
+    """
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+    fingerprint = _source_fingerprint(path)
+    rows_done = 0
+    offset = 0
+    stats = {"read": 0, "imported": 0, "rejected": 0}
+
+    if resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if {k: checkpoint.get(k) for k in fingerprint} != fingerprint:
+            raise ValueError("Checkpoint belongs to a different or modified input file; rerun without --resume.")
+        rows_done = checkpoint["rows_done"]
+        offset = checkpoint.get("offset", 0)
+        stats = {key: checkpoint.get(key, 0) for key in stats}
+
+    stats["skipped"] = rows_done
+    today = date.today()
+    batch = []
+    last_row = rows_done
+    last_offset = offset
+    rejects = None
+    if reject_path:
+        rejects = open(reject_path, "a" if resume else "w", encoding="utf-8")
+        if rows_done:
+            # Drop rejects written after the last checkpoint; those rows are read again
+            rejects.truncate(checkpoint.get("rejects_offset", 0))
+            rejects.seek(0, os.SEEK_END)
+
+    def flush():
+        if batch:
+            farmer_store.put_many(batch)
+            stats["imported"] += len(batch)
+            batch.clear()
+        progress = {**fingerprint, "rows_done": last_row, "offset": last_offset, **stats}
+        if rejects:
+            rejects.flush()
+            progress["rejects_offset"] = rejects.tell()
+        _write_json_atomic(checkpoint_path, progress)
+
+    try:
+        for row_number, row, end_offset in iter_rows(path, fmt, offset, rows_done if offset else 0):
+            if row_number <= rows_done:
+                # Checkpoint without an offset: skip by row count
+                continue
+            last_row, last_offset = row_number, end_offset
+            if row is None:
+                continue
+            stats["read"] += 1
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                batch.append(validate_row(row, today))
+            except ValueError as e:
+                stats["rejected"] += 1
+                if rejects:
+                    rejects.write(json.dumps({"row": row_number, "error": str(e)}, ensure_ascii=False) + "\n")
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    finally:
+        if rejects:
+            rejects.close()
+        invalidate_cache()
+
+    return stats
+
+
+def export_records(path, fmt=None):
+    """Stream every stored record to an NDJSON or CSV file. Returns the row count."""
+    fmt = fmt or detect_format(path)
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore") if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+        for farmer_id, record in farmer_store.iter_all():
+            row = {"farmer_id": farmer_id, **record}
+            if writer:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    # Readers never see a half-written export
+    os.replace(tmp_path, path)
+    return count
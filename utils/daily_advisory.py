@@ -0,0 +1,47 @@
+"""
+Materialised daily advisories for Track Farming.
+The nightly job (run_nightly_advisories.py) stores one advisory per farmer per
+day and language, tagged with a hash of the prompt inputs. The app shows a
+stored advisory instantly while the hash still matches; a stage transition, a
+new rain outlook for the weather bucket or a record edit changes the hash and
+the advisory is regenerated. Live temperature and humidity do not.
+"""
+
+from datetime import date
+
+from utils.advisory_batch import advisory_inputs_hash, context_key, weather_signature
+from utils.farmer_store import farmer_store
+from utils.tracking_logic import calculate_crop_age, get_crop_stage, resolve_crop_key
+
+
+def current_inputs_hash(record, weather, lang, today=None):
+    """Same hash the nightly job computes, from the live view's record and weather."""
+    age = calculate_crop_age(record.get("plantation_date", ""), today=today)
+    crop_name = record.get("crop_name", "")
+    key = context_key(
+        resolve_crop_key(crop_name), get_crop_stage(crop_name, age),
+        record.get("soil_type"), record.get("fertilizer"), weather_signature(record.get("location", ""), weather), lang
+    )
+    return advisory_inputs_hash(key, record)
+
+
+def get_stored_advisory(farmer_id, input_hash, lang, today=None):
+    """Today's stored advisory if it was generated from the same inputs, else None."""
+    try:
+        stored = farmer_store.get_advisory(farmer_id, today or date.today(), lang)
+    except Exception as e:
+        print(f"Error loading advisory: {e}")
+        return None
+    if stored and stored[0] == input_hash:
+        return stored[1]
+    return None
+
+
+def store_advisory(farmer_id, input_hash, lang, advisory, today=None):
+    """Persist a freshly generated advisory for today."""
+    try:
+        farmer_store.put_advisories([(farmer_id, today or date.today(), lang, input_hash, advisory)])
+        return True
+    except Exception as e:
+        print(f"Error saving advisory: {e}")
+        return False
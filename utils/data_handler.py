@@ -1,56 +1,104 @@
-import json
 import os
-from datetime import datetime
+import threading
+from types import MappingProxyType
 
+from utils.farmer_store import farmer_store
+from utils.metrics import metrics
+
+# Legacy flat file; its contents are migrated into the store on first use
 DATA_FILE = "data/farmers_data.json"
 
+# Process-wide read cache. Entries are valid while the store files' (mtime, size)
+# token is unchanged; our own writes drop the cache explicitly.
+_cache_lock = threading.Lock()
+_cache = {"token": None, "records": {}, "all": None}
+
+def _store_token():
+    """(mtime, size) of the database and its WAL; changes on any commit from any process."""
+    token = []
+    for path in (farmer_store.db_path, farmer_store.db_path + "-wal"):
+        try:
+            st = os.stat(path)
+            token.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            token.append(None)
+    return tuple(token)
+
+def _freeze(value):
+    """Read-only view so callers cannot mutate the shared cached record."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _valid_cache(token):
+    with _cache_lock:
+        if _cache["token"] != token:
+            _cache["token"] = token
+            _cache["records"] = {}
+            _cache["all"] = None
+        return _cache
+
+def invalidate_cache():
+    """Drop every cached record (called after our own writes)."""
+    with _cache_lock:
+        _cache["token"] = None
+        _cache["records"] = {}
+        _cache["all"] = None
+
 def get_farmer_data(farmer_id=None):
-    """Load farmer data from JSON file. If farmer_id provided, returns specific data."""
-    if not os.path.exists(DATA_FILE):
-        return {}
-    
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    """Load farmer data from the store. If farmer_id provided, returns specific data.
+
+    Returned records are read-only views; copy with dict(...) before editing.
+    """
+    with metrics.timer("farmer_data_read", scope="one" if farmer_id else "all") as span:
+        try:
+            # Take the token before reading so a concurrent write forces a reload next time
+            cache = _valid_cache(_store_token())
             if farmer_id:
-                return data.get(str(farmer_id), {})
-            return data
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        return {}
+                key = str(farmer_id)
+                record = cache["records"].get(key)
+                span.label(cache="hit" if record is not None else "miss")
+                if record is None:
+                    record = _freeze(farmer_store.get(key))
+                    cache["records"][key] = record
+                return record
+
+            span.label(cache="hit" if cache["all"] is not None else "miss")
+            if cache["all"] is None:
+                records = {fid: _freeze(rec) for fid, rec in farmer_store.iter_all()}
+                cache["records"].update(records)
+                cache["all"] = MappingProxyType(records)
+            return cache["all"]
+        except Exception as e:
+            # Logged as an error event by the timer
+            span.label(outcome="error")
+            span.set(error=str(e))
+            return {}
 
 def save_farmer_data(farmer_id, data):
-    """Save farmer data to JSON file keyed by farmer_id."""
+    """Save farmer data keyed by farmer_id (single-row upsert)."""
     try:
-        # Load existing
-        all_data = get_farmer_data()
-        
-        # Update specific farmer
-        all_data[str(farmer_id)] = data
-        
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(all_data, f, indent=4, ensure_ascii=False)
+        farmer_store.put(farmer_id, dict(data))
         return True
     except Exception as e:
         print(f"Error saving data: {e}")
         return False
+    finally:
+        invalidate_cache()
 
 def clear_farmer_data(farmer_id=None):
     """Clear the tracking data. If farmer_id provided, clears only that farmer."""
-    if not os.path.exists(DATA_FILE): return True
-    
     try:
         if farmer_id:
-            all_data = get_farmer_data()
-            if str(farmer_id) in all_data:
-                del all_data[str(farmer_id)]
-                with open(DATA_FILE, "w", encoding="utf-8") as f:
-                    json.dump(all_data, f, indent=4, ensure_ascii=False)
+            farmer_store.delete(farmer_id)
         else:
             # Clear all
-            os.remove(DATA_FILE)
+            farmer_store.clear()
         return True
-    except OSError as e:
-        print(f"Error deleting data file: {e}")
+    except Exception as e:
+        print(f"Error deleting data: {e}")
         return False
-    return True
+    finally:
+        invalidate_cache()
@@ -0,0 +1,291 @@
+"""
+Indexed storage engine for farmer tracking records.
+Uses SQLite in WAL mode so every read or write touches a single farmer row
+(primary-key lookup) instead of rewriting the whole JSON file.
+
+Single-record writes go through a group-commit writer: updates arriving from
+different sessions within a short window share one transaction and one fsync.
+SQLite's own file locks make this safe across Streamlit worker processes.
+
+The same database holds materialised daily advisories (see utils/daily_advisory.py).
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+DB_FILE = "data/farmers.db"
+LEGACY_JSON_FILE = "data/farmers_data.json"
+
+# How long the writer waits for more updates before committing a batch
+COMMIT_WINDOW_SECONDS = float(os.getenv("FARMER_STORE_COMMIT_WINDOW_MS", "2")) / 1000
+MAX_COMMIT_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS farmers (
+    farmer_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS advisories (
+    farmer_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    advisory TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (farmer_id, day, lang)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class _PendingWrite:
+    def __init__(self, op, farmer_id=None, payload=None):
+        self.op = op
+        self.farmer_id = farmer_id
+        self.payload = payload
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class _GroupCommitWriter:
+    """Background thread that commits queued single-record writes in batches."""
+
+    def __init__(self, store, window=COMMIT_WINDOW_SECONDS, max_batch=MAX_COMMIT_BATCH):
+        self.store = store
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, op, farmer_id=None, payload=None):
+        """Queue a write and block until the batch containing it is durable."""
+        pending = _PendingWrite(op, farmer_id, payload)
+        self._ensure_started()
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error:
+            raise pending.error
+        return pending.result
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="farmer-store-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch):
+        try:
+            conn = self.store._connect()
+            # Every commit from this connection is fsynced; batching amortises the cost
+            conn.execute("PRAGMA synchronous=FULL")
+            now = datetime.now().isoformat(timespec="seconds")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for pending in batch:
+                    pending.result = self.store._apply(conn, pending, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception as e:
+            for pending in batch:
+                pending.error = e
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+
+class FarmerStore:
+    def __init__(self, db_path=DB_FILE, legacy_json_path=LEGACY_JSON_FILE):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialised = False
+        self._writer = _GroupCommitWriter(self)
+
+    def _connect(self):
+        """Return this thread's connection, creating schema and migrating on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            folder = os.path.dirname(self.db_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            # Autocommit mode; writes open explicit transactions below
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+
+        if not self._initialised:
+            with self._init_lock:
+                if not self._initialised:
+                    conn.executescript(SCHEMA)
+                    self._migrate_legacy_json(conn)
+                    self._initialised = True
+        return conn
+
+    def _migrate_legacy_json(self, conn):
+        """One-time import of data/farmers_data.json into the store."""
+        row = conn.execute("SELECT value FROM meta WHERE key = 'legacy_json_migrated'").fetchone()
+        if row or not os.path.exists(self.legacy_json_path):
+            return
+
+        try:
+            with open(self.legacy_json_path, "r", encoding="utf-8") as f:
+                raw = f.read()
+            legacy = json.loads(raw) if raw.strip() else {}
+        except Exception as e:
+            # Leave the flag unset so the migration is retried once the file is fixed
+            print(f"Error migrating legacy farmer data: {e}")
+            return
+
+        now = datetime.now().isoformat(timespec="seconds")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another worker may have finished the migration while we waited for the lock
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_migrated'").fetchone() is None:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO farmers (farmer_id, data, updated_at) VALUES (?, ?, ?)",
+                    [(str(fid), json.dumps(rec, ensure_ascii=False), now) for fid, rec in legacy.items()]
+                )
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('legacy_json_migrated', ?)",
+                    (f"{len(legacy)} records at {now}",)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, farmer_id):
+        """Return one farmer's record, or {} if not tracked."""
+        row = self._connect().execute(
+            "SELECT data FROM farmers WHERE farmer_id = ?", (str(farmer_id),)
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def get_all(self):
+        """Return every record keyed by farmer_id."""
+        return dict(self.iter_all())
+
+    def iter_all(self, batch_size=1000):
+        """Yield (farmer_id, record) pairs in farmer_id order without loading the whole table."""
+        conn = self._connect()
+        last_id = ""
+        while True:
+            rows = conn.execute(
+                "SELECT farmer_id, data FROM farmers WHERE farmer_id > ? ORDER BY farmer_id LIMIT ?",
+                (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            for farmer_id, data in rows:
+                yield farmer_id, json.loads(data)
+            last_id = rows[-1][0]
+
+    def _apply(self, conn, pending, now):
+        """Run one queued write inside the writer's open transaction."""
+        if pending.op == "put":
+            conn.execute(
+                "INSERT INTO farmers (farmer_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(farmer_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (pending.farmer_id, pending.payload, now)
+            )
+            return True
+        if pending.op == "delete":
+            conn.execute("DELETE FROM advisories WHERE farmer_id = ?", (pending.farmer_id,))
+            return conn.execute("DELETE FROM farmers WHERE farmer_id = ?", (pending.farmer_id,)).rowcount > 0
+        if pending.op == "clear":
+            conn.execute("DELETE FROM advisories")
+            conn.execute("DELETE FROM farmers")
+            return True
+        raise ValueError(f"Unknown write operation: {pending.op}")
+
+    def put(self, farmer_id, data):
+        """Insert or replace one farmer's record (group-committed)."""
+        # Serialise in the caller's thread so bad data fails only this call
+        payload = json.dumps(data, ensure_ascii=False)
+        return self._writer.submit("put", str(farmer_id), payload)
+
+    def put_many(self, items):
+        """Insert or replace several (farmer_id, record) pairs in one transaction (bulk path)."""
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [(str(fid), json.dumps(rec, ensure_ascii=False), now) for fid, rec in items]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO farmers (farmer_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(farmer_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                rows
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, farmer_id):
+        """Remove one farmer's record. Returns True if a row was deleted."""
+        return self._writer.submit("delete", str(farmer_id))
+
+    def clear(self):
+        """Remove every farmer record (the migration flag is kept)."""
+        return self._writer.submit("clear")
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM farmers").fetchone()[0]
+
+    def get_advisory(self, farmer_id, day, lang):
+        """Return (input_hash, advisory) stored for this farmer/day/language, or None."""
+        return self._connect().execute(
+            "SELECT input_hash, advisory FROM advisories WHERE farmer_id = ? AND day = ? AND lang = ?",
+            (str(farmer_id), str(day), lang)
+        ).fetchone()
+
+    def put_advisories(self, rows):
+        """Insert or replace (farmer_id, day, lang, input_hash, advisory) rows in one transaction."""
+        now = datetime.now().isoformat(timespec="seconds")
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO advisories (farmer_id, day, lang, input_hash, advisory, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(str(fid), str(day), lang, input_hash, advisory, now) for fid, day, lang, input_hash, advisory in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def prune_advisories(self, before_day):
+        """Delete advisories older than before_day. Returns the number removed."""
+        return self._connect().execute("DELETE FROM advisories WHERE day < ?", (str(before_day),)).rowcount
+
+
+farmer_store = FarmerStore()
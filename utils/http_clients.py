@@ -0,0 +1,134 @@
+"""
+Shared HTTP clients, one keep-alive connection pool per provider.
+Every module gets its Groq / AsyncGroq client or requests session from here
+instead of building its own, so TLS handshakes happen once per pool.
+
+HTTP/2 is used for Groq when the `h2` package is installed (pip install h2).
+requests has no HTTP/2 support; its sessions still reuse connections.
+httpx, requests and the Groq SDK are imported on first use to keep app startup fast.
+
+Configuration (environment):
+    GROQ_API_KEY            Groq key (clients are None without it)
+    GROQ_BASE_URL           alternative OpenAI-compatible endpoint (e.g. a local mock)
+    HTTP2                   "0" disables HTTP/2 (default "1")
+    HTTP_MAX_CONNECTIONS    connections per pool (default 20)
+    HTTP_MAX_KEEPALIVE      idle connections kept per pool (default 10)
+    HTTP_KEEPALIVE_EXPIRY   seconds an idle connection is kept (default 60)
+    HTTP_CONNECT_TIMEOUT    seconds (default 5)
+    HTTP_READ_TIMEOUT       seconds (default 60)
+"""
+
+import importlib.util
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP2 = os.getenv("HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _timeout():
+    import httpx
+    return httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+def _limits():
+    import httpx
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+
+
+def _shared(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def groq_api_key():
+    return os.getenv("GROQ_API_KEY")
+
+
+def get_groq():
+    """Process-wide Groq client, or None without GROQ_API_KEY."""
+    if not groq_api_key():
+        return None
+
+    def build():
+        import httpx
+        from groq import Groq
+        # 429 retries are handled by utils.rate_limiter, which shares the quota across callers
+        return Groq(
+            api_key=groq_api_key(),
+            base_url=os.getenv("GROQ_BASE_URL") or None,
+            timeout=_timeout(),
+            max_retries=0,
+            http_client=httpx.Client(http2=HTTP2, limits=_limits(), timeout=_timeout())
+        )
+    return _shared("groq", build)
+
+
+def get_async_groq():
+    """
+    Process-wide AsyncGroq client, or None without GROQ_API_KEY.
+    Its pool is bound to the event loop that first uses it (the coalescing client's loop).
+    """
+    if not groq_api_key():
+        return None
+
+    def build():
+        import httpx
+        from groq import AsyncGroq
+        return AsyncGroq(
+            api_key=groq_api_key(),
+            base_url=os.getenv("GROQ_BASE_URL") or None,
+            timeout=_timeout(),
+            max_retries=0,
+            http_client=httpx.AsyncClient(http2=HTTP2, limits=_limits(), timeout=_timeout())
+        )
+    return _shared("groq_async", build)
+
+
+def get_session(name):
+    """Keep-alive requests.Session for one provider (e.g. "huggingface", "weather")."""
+    def build():
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONNECTIONS)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    return _shared(f"session:{name}", build)
+
+
+def request_timeout():
+    """(connect, read) timeout tuple for requests sessions."""
+    return (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+
+def close_all():
+    """Close every pool (sync clients only; async pools close with their loop)."""
+    with _lock:
+        clients = list(_clients.items())
+        _clients.clear()
+    for name, client in clients:
+        if name != "groq_async":
+            client.close()
@@ -1,6 +1,8 @@
 import PIL.Image
 import io
 
+from utils.metrics import metrics
+
 class ImageHandler:
     @staticmethod
     def process_image(uploaded_file):
@@ -8,8 +10,13 @@ class ImageHandler:
         Processes Streamlit uploaded file into a PIL Image.
         """
         if uploaded_file is not None:
-            image = PIL.Image.open(uploaded_file)
-            return image
+            with metrics.timer("image_process") as span:
+                image = PIL.Image.open(uploaded_file)
+                size = getattr(uploaded_file, "size", None)
+                span.set(bytes=size, format=image.format, width=image.width, height=image.height)
+                if size:
+                    metrics.observe("image_upload_bytes", size)
+                return image
         return None
 
     @staticmethod
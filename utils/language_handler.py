@@ -47,6 +47,8 @@ TRANSLATIONS = {
         "potassium": "Potassium (K)",
         "optional_hint": "(Optional: say 'next' or 'skip')",
         "finishing": "Thank you. Let me analyze that for you...",
+        "done_message": "Done! Press New Question if you want to ask something else.",
+        "options_are": "Options are: ",
     },
     "hi": {
         "title": "एआई खेती सहायक",
@@ -96,9 +98,55 @@ TRANSLATIONS = {
         "potassium": "पोटेशियम (K)",
         "optional_hint": "(वैकल्पिक: 'अगला' या 'छोड़ें' कहें)",
         "finishing": "धन्यवाद। मुझे आपके लिए इसका विश्लेषण करने दें...",
+        "done_message": "हो गया! कुछ और पूछना हो तो नया सवाल दबाएं।",
+        "options_are": "विकल्प हैं: ",
     }
 }
 
+# Smart Talk answer buttons per question (bilingual)
+QUESTION_OPTIONS = {
+    "q_season": {
+        "en": ["Kharif", "Rabi", "Zaid"],
+        "hi": ["खरीफ", "रबी", "जायद"]
+    },
+    "q_profit": {
+        "en": ["Low", "Medium", "High"],
+        "hi": ["कम", "मध्यम", "अधिक"]
+    },
+    "q_soil": {
+        "en": ["Clay", "Sandy", "Loamy", "Black", "Red", "Not sure"],
+        "hi": ["चिकनी", "रेतीली", "दोमट", "काली", "लाल", "पता नहीं"]
+    },
+    "q_water": {
+        "en": ["Low", "Medium", "High", "Not sure"],
+        "hi": ["कम", "मध्यम", "अधिक", "पता नहीं"]
+    },
+    "q_rainfall": {
+        "en": ["Low", "Medium", "High"],
+        "hi": ["कम", "मध्यम", "अधिक"]
+    }
+}
+
+# Phrases Smart Talk speaks word for word (pre-synthesised at startup)
+SPOKEN_KEYS = ["welcome", "ask_category", "q_location", "q_season", "q_profit", "q_soil", "q_water",
+               "q_crop", "q_rainfall", "done_message"]
+
+
+def spoken_question(key, lang):
+    """A Smart Talk question as it is read aloud: the question followed by its options."""
+    strings = TRANSLATIONS.get(lang, TRANSLATIONS["en"])
+    text = strings.get(key, key)
+    options = QUESTION_OPTIONS.get(key, {}).get(lang, [])
+    if options:
+        if text[-1] not in ".?!।":
+            text += "."
+        text += " " + strings["options_are"] + ", ".join(options)
+    return text
+
+
+def static_phrases(lang):
+    return [spoken_question(key, lang) for key in SPOKEN_KEYS]
+
 class LanguageHandler:
     def __init__(self, lang="en"):
         self.lang = lang
@@ -0,0 +1,165 @@
+"""
+Two-tier LLM response cache.
+An in-process LRU sits in front of a SQLite store that every Streamlit worker
+shares, so a repeated question (same model, system instruction, prompt,
+temperature and max_tokens) is answered without an API call.
+
+Configuration (environment):
+    LLM_CACHE_ENABLED         "0" disables the cache (default "1")
+    LLM_CACHE_FILE            disk store path (default data/llm_cache.db)
+    LLM_CACHE_TTL             seconds an entry stays valid (default 86400)
+    LLM_CACHE_MEMORY_ENTRIES  in-process LRU size (default 512)
+    LLM_CACHE_MAX_ENTRIES     disk store size (default 20000)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+CACHE_FILE = os.getenv("LLM_CACHE_FILE", "data/llm_cache.db")
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL", "86400"))
+MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+MAX_DISK_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+# Trim the disk store every this many writes
+EVICT_EVERY = 100
+
+
+def normalize_text(text):
+    """Whitespace-insensitive form of a prompt so trivially different spacing shares an entry."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFC", text)
+    lines = [" ".join(line.split()) for line in text.strip().splitlines()]
+    # Collapse runs of blank lines
+    compact = []
+    for line in lines:
+        if line or (compact and compact[-1]):
+            compact.append(line)
+    return "\n".join(compact)
+
+
+def make_key(model, system_instruction, prompt, temperature, max_tokens):
+    """Stable cache key for one completion request."""
+    payload = json.dumps([
+        model,
+        normalize_text(system_instruction),
+        normalize_text(prompt),
+        round(float(temperature), 2),
+        int(max_tokens)
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL_SECONDS, memory_entries=MEMORY_ENTRIES,
+                 max_disk_entries=MAX_DISK_ENTRIES, enabled=CACHE_ENABLED):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.enabled = enabled
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key, expires_at, value):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Cached response text, or None."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[1]
+
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            print(f"LLM cache read error: {e}")
+            row = None
+
+        with self._lock:
+            self.stats["disk_hits" if row else "misses"] += 1
+        if row:
+            self._remember(key, row[1], row[0])
+            return row[0]
+        return None
+
+    def put(self, key, value):
+        """Store a successful response. Callers must not pass error text."""
+        if not self.enabled or not value:
+            return
+        now = time.time()
+        expires_at = now + self.ttl
+        self._remember(key, expires_at, value)
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now)
+            )
+            with self._lock:
+                self.stats["stores"] += 1
+                self._writes += 1
+                evict = self._writes % EVICT_EVERY == 0
+            if evict:
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"LLM cache write error: {e}")
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then least recently used ones beyond the size limit."""
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        self._connect().execute("DELETE FROM responses")
+
+
+response_cache = ResponseCache()
@@ -1,5 +1,4 @@
 import os
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,6 +8,8 @@ class GeminiClient:
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables.")
+        # Imported here: the SDK is slow to import and only needed once a key is configured
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         self.text_model = genai.GenerativeModel('gemini-2.0-flash')
         self.vision_model = genai.GenerativeModel('gemini-2.0-flash')
@@ -27,16 +28,27 @@ class GeminiClient:
         except Exception as e:
             return f"Error: {str(e)}"
 
-    def get_vision_completion(self, prompt, image_data, system_instruction=None):
+    def get_vision_completion(self, prompt, image_data, system_instruction=None, max_tokens=None):
         try:
             content = [prompt, image_data]
             if system_instruction:
                 prompt_with_sys = f"{system_instruction}\n\n{prompt}"
                 content[0] = prompt_with_sys
             
-            response = self.vision_model.generate_content(content)
+            # max_tokens: the "disease" mode budget from token_budget, when given
+            config = {"max_output_tokens": max_tokens} if max_tokens else None
+            response = self.vision_model.generate_content(content, generation_config=config)
             return response.text
         except Exception as e:
             return f"Error: {str(e)}"
 
-llm_client = GeminiClient()
+_llm_client = None
+
+def __getattr__(name):
+    # llm_client is created on first access, so importing this module never raises
+    global _llm_client
+    if name == "llm_client":
+        if _llm_client is None:
+            _llm_client = GeminiClient()
+        return _llm_client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
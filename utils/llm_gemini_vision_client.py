@@ -1,5 +1,4 @@
 import os
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,11 +9,12 @@ class GeminiVisionClient:
         if not api_key:
             self.model = None
         else:
+            import google.generativeai as genai
             genai.configure(api_key=api_key)
             # Using Gemini Exp (experimental) - free and supports vision
             self.model = genai.GenerativeModel('gemini-exp-1206')
 
-    def get_vision_completion(self, prompt, image_data, system_instruction=None):
+    def get_vision_completion(self, prompt, image_data, system_instruction=None, max_tokens=None):
         if not self.model:
             return "Error: GEMINI_API_KEY not found for vision tasks."
         
@@ -24,9 +24,21 @@ class GeminiVisionClient:
                 prompt_with_sys = f"{system_instruction}\n\n{prompt}"
                 content[0] = prompt_with_sys
             
-            response = self.model.generate_content(content)
+            # max_tokens: the "disease" mode budget from token_budget, when given
+            config = {"max_output_tokens": max_tokens} if max_tokens else None
+            response = self.model.generate_content(content, generation_config=config)
             return response.text
         except Exception as e:
             return f"Gemini Vision Error: {str(e)}"
 
-gemini_vision_client = GeminiVisionClient()
+_gemini_vision_client = None
+
+def __getattr__(name):
+    # gemini_vision_client is created on first access to keep the SDK import off startup
+    global _gemini_vision_client
+    if name == "gemini_vision_client":
+        if _gemini_vision_client is None:
+            _gemini_vision_client = GeminiVisionClient()
+        return _gemini_vision_client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
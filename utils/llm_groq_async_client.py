@@ -0,0 +1,138 @@
+"""
+Asyncio Groq client with bounded concurrency and in-flight request coalescing.
+When many sessions ask the same question at once (e.g. a cooperative meeting),
+only one network call runs; every waiter receives its result. Response cache
+lookups and writes (SQLite) run in worker threads, off the event loop.
+
+groq_client here is a drop-in synchronous wrapper with the same interface as
+utils.llm_groq_client.GroqClient, so app.py only changes its import.
+"""
+
+import asyncio
+import os
+import threading
+
+from utils.http_clients import get_async_groq
+from utils.llm_cache import make_key, response_cache
+from utils.llm_groq_client import GroqClient, groq_client as sync_groq_client, is_error_response, record_usage
+from utils.metrics import metrics
+from utils.rate_limiter import current_priority, estimate_tokens, groq_scheduler, usage_tokens
+from utils.token_budget import current_mode
+
+MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+
+
+class AsyncGroqClient:
+    def __init__(self, max_concurrency=MAX_CONCURRENCY):
+        self.model = GroqClient.DEFAULT_MODEL
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = {}  # cache key -> Future shared by identical requests
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    @property
+    def client(self):
+        # Built on first use, on whichever loop calls it first; None without GROQ_API_KEY
+        return get_async_groq()
+
+    async def get_completion(self, prompt, system_instruction=None, temperature=0.7, max_tokens=1024, priority=None,
+                             mode=None):
+        if not self.client:
+            return "Error: GROQ_API_KEY not found. Please add it to your .env file."
+
+        with metrics.timer("llm_completion", provider="groq", model=self.model, stream=False,
+                           mode=mode or "other") as span:
+            cache_key = make_key(self.model, system_instruction, prompt, temperature, max_tokens)
+            cached = await asyncio.to_thread(response_cache.get, cache_key)
+            if cached is not None:
+                span.label(outcome="cache_hit")
+                return cached
+
+            pending = self._in_flight.get(cache_key)
+            if pending is not None:
+                self.stats["coalesced"] += 1
+                span.label(outcome="coalesced")
+                # shield: one waiter being cancelled must not cancel the shared call
+                return await asyncio.shield(pending)
+
+            pending = asyncio.get_running_loop().create_future()
+            self._in_flight[cache_key] = pending
+            try:
+                result = await self._call(prompt, system_instruction, temperature, max_tokens, priority, span)
+                # Waiters get the answer before the cache write
+                pending.set_result(result)
+                if not is_error_response(result):
+                    await asyncio.to_thread(response_cache.put, cache_key, result)
+                return result
+            finally:
+                del self._in_flight[cache_key]
+                if not pending.done():
+                    # Leader was cancelled; waiters see CancelledError instead of hanging
+                    pending.cancel()
+
+    async def _call(self, prompt, system_instruction, temperature, max_tokens, priority, span):
+        async with self._semaphore:
+            self.stats["calls"] += 1
+            try:
+                messages = []
+                if system_instruction:
+                    messages.append({"role": "system", "content": system_instruction})
+                messages.append({"role": "user", "content": prompt})
+
+                tokens = estimate_tokens(system_instruction, prompt, max_tokens=max_tokens)
+                response = await groq_scheduler.acall(lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                ), tokens, priority)
+                groq_scheduler.settle(tokens, usage_tokens(response))
+                record_usage(span, response)
+                return response.choices[0].message.content
+            except Exception as e:
+                span.label(outcome="error")
+                span.set(error=str(e))
+                return f"Groq Error: {str(e)}"
+
+
+class CoalescingGroqClient:
+    """
+    Synchronous facade over AsyncGroqClient.
+    Calls from any thread (each Streamlit session runs in its own) are executed on
+    one background event loop, which is where identical requests get coalesced.
+    """
+
+    def __init__(self, async_client=None):
+        self.async_client = async_client or AsyncGroqClient()
+        self.model = self.async_client.model
+        self._loop = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self.async_client.client
+
+    def _ensure_loop(self):
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="groq-async-loop", daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def get_completion(self, prompt, system_instruction=None, temperature=0.7, max_tokens=1024):
+        # The loop thread has its own context, so pass the caller's priority and mode explicitly
+        coro = self.async_client.get_completion(
+            prompt, system_instruction, temperature, max_tokens, priority=current_priority(), mode=current_mode()
+        )
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    def stream_completion(self, prompt, system_instruction=None, temperature=0.7, max_tokens=1024):
+        # Streams are per-viewer; they go straight through the synchronous client
+        return sync_groq_client.stream_completion(prompt, system_instruction, temperature, max_tokens)
+
+    def cache_stats(self):
+        return {**response_cache.stats, **self.async_client.stats}
+
+
+groq_client = CoalescingGroqClient()
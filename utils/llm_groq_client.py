@@ -1,37 +1,142 @@
-import os
-from groq import Groq
-from dotenv import load_dotenv
+from utils.http_clients import get_groq
+from utils.llm_cache import make_key, response_cache
+from utils.metrics import metrics
+from utils.rate_limiter import estimate_tokens, groq_scheduler, usage_tokens
+from utils.token_budget import current_mode
 
-load_dotenv()
+# Prefixes get_completion uses when it returns an error message instead of content
+ERROR_PREFIXES = ("Error:", "Groq Error:")
+
+def is_error_response(text):
+    """True if text is one of the client's error strings rather than model output."""
+    return not text or text.startswith(ERROR_PREFIXES)
+
+class GroqStreamError(Exception):
+    """Raised by stream_completion so callers can switch to their fallback, even mid-stream."""
 
 class GroqClient:
+    DEFAULT_MODEL = "llama-3.1-8b-instant"
+
     def __init__(self):
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            # Placeholder/Safe behavior if key is missing during first setup
-            self.client = None
-        else:
-            self.client = Groq(api_key=api_key)
-        self.model = "llama-3.1-8b-instant"
-
-    def get_completion(self, prompt, system_instruction=None):
+        self.model = self.DEFAULT_MODEL
+
+    @property
+    def client(self):
+        # Shared pooled client, built (and the SDK imported) on first use; None without GROQ_API_KEY
+        return get_groq()
+
+    def cache_stats(self):
+        """Response cache hit/miss counters for this process."""
+        return dict(response_cache.stats)
+
+    def get_completion(self, prompt, system_instruction=None, temperature=0.7, max_tokens=1024):
         if not self.client:
             return "Error: GROQ_API_KEY not found. Please add it to your .env file."
         
-        try:
-            messages = []
-            if system_instruction:
-                messages.append({"role": "system", "content": system_instruction})
-            messages.append({"role": "user", "content": prompt})
-
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1024,
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Groq Error: {str(e)}"
+        with metrics.timer("llm_completion", provider="groq", model=self.model, stream=False,
+                           mode=current_mode() or "other") as span:
+            cache_key = make_key(self.model, system_instruction, prompt, temperature, max_tokens)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                span.label(outcome="cache_hit")
+                return cached
+            
+            try:
+                messages = []
+                if system_instruction:
+                    messages.append({"role": "system", "content": system_instruction})
+                messages.append({"role": "user", "content": prompt})
+
+                tokens = estimate_tokens(system_instruction, prompt, max_tokens=max_tokens)
+                response = groq_scheduler.call(lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                ), tokens)
+                groq_scheduler.settle(tokens, usage_tokens(response))
+                record_usage(span, response)
+                content = response.choices[0].message.content
+                # Never cache error text or empty replies
+                if not is_error_response(content):
+                    response_cache.put(cache_key, content)
+                return content
+            except Exception as e:
+                span.label(outcome="error")
+                span.set(error=str(e))
+                return f"Groq Error: {str(e)}"
+
+    def stream_completion(self, prompt, system_instruction=None, temperature=0.7, max_tokens=1024):
+        """
+        Yield the response in text chunks as they arrive (for st.write_stream).
+        Cached responses are yielded in one piece. Raises GroqStreamError on any failure,
+        including one partway through the stream.
+        """
+        if not self.client:
+            raise GroqStreamError("GROQ_API_KEY not found. Please add it to your .env file.")
+        
+        with metrics.timer("llm_completion", provider="groq", model=self.model, stream=True,
+                           mode=current_mode() or "other") as span:
+            cache_key = make_key(self.model, system_instruction, prompt, temperature, max_tokens)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                span.label(outcome="cache_hit")
+                yield cached
+                return
+            
+            parts = []
+            try:
+                messages = []
+                if system_instruction:
+                    messages.append({"role": "system", "content": system_instruction})
+                messages.append({"role": "user", "content": prompt})
+
+                tokens = estimate_tokens(system_instruction, prompt, max_tokens=max_tokens)
+                stream = groq_scheduler.call(lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                ), tokens)
+                for chunk in stream:
+                    used = usage_tokens(chunk)
+                    if used is not None:
+                        # Usage arrives on the final chunk
+                        groq_scheduler.settle(tokens, used)
+                        record_usage(span, chunk)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if not parts:
+                            metrics.observe("llm_first_token_seconds", span.elapsed(), provider="groq", model=self.model)
+                        parts.append(delta)
+                        yield delta
+            except Exception as e:
+                raise GroqStreamError(f"Groq Error: {str(e)}") from e
+            
+            content = "".join(parts)
+            span.set(response_chars=len(content))
+            if not is_error_response(content):
+                response_cache.put(cache_key, content)
+
+def record_usage(span, response):
+    """Token counts from a completion (or final stream chunk) into the span and the per-mode token counters."""
+    labels = {name: span.labels.get(name) for name in ("provider", "model", "mode")}
+    choices = getattr(response, "choices", None)
+    if choices and getattr(choices[0], "finish_reason", None) == "length":
+        # Cut off by max_tokens: the mode's budget may be too tight
+        span.set(truncated=True)
+        metrics.inc("llm_truncated", **labels)
+    usage = getattr(response, "usage", None) or getattr(getattr(response, "x_groq", None), "usage", None)
+    if usage is None:
+        return
+    counts = {"prompt": getattr(usage, "prompt_tokens", None), "completion": getattr(usage, "completion_tokens", None)}
+    span.set(**{f"{kind}_tokens": n for kind, n in counts.items() if n is not None})
+    for kind, n in counts.items():
+        if n:
+            metrics.inc("llm_tokens", n, kind=kind, **labels)
+            metrics.observe(f"llm_{kind}_tokens", n, mode=labels["mode"])
 
 groq_client = GroqClient()
@@ -1,19 +1,21 @@
-import os
 import base64
-from groq import Groq
-from dotenv import load_dotenv
 
-load_dotenv()
+from utils.http_clients import get_groq
+from utils.llm_groq_client import record_usage
+from utils.metrics import metrics
+from utils.rate_limiter import estimate_tokens, groq_scheduler, usage_tokens
+from utils.token_budget import current_mode, max_tokens_for
+
+IMAGE_TOKEN_ESTIMATE = 1500
+VISION_MODEL = "llava-v1.5-7b-4096-preview"  # Llava 1.5 7B - currently available vision model
 
 class GroqVisionClient:
-    def __init__(self):
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            self.client = None
-        else:
-            self.client = Groq(api_key=api_key)
+    @property
+    def client(self):
+        # Same pooled client as text completions; None without GROQ_API_KEY
+        return get_groq()
     
-    def get_vision_completion(self, prompt, image_data, system_instruction=None):
+    def get_vision_completion(self, prompt, image_data, system_instruction=None, max_tokens=None):
         """
         Get vision completion from Groq's Llama 3.2 Vision model.
         
@@ -21,6 +23,7 @@ class GroqVisionClient:
             prompt: Text prompt for the vision task
             image_data: PIL Image object
             system_instruction: Optional system instruction
+            max_tokens: completion budget (default: the "disease" mode budget)
         
         Returns:
             Response text from the model
@@ -28,48 +31,57 @@ class GroqVisionClient:
         if not self.client:
             return "Error: GROQ_API_KEY not found for vision tasks."
         
-        try:
-            # Convert PIL Image to base64
-            import io
-            buffered = io.BytesIO()
-            image_data.save(buffered, format="JPEG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+        max_tokens = max_tokens or max_tokens_for("disease")
+        with metrics.timer("llm_completion", provider="groq", model=VISION_MODEL, stream=False,
+                           mode=current_mode() or "other") as span:
+            try:
+                # Convert PIL Image to base64
+                import io
+                buffered = io.BytesIO()
+                image_data.save(buffered, format="JPEG")
+                img_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
             
-            # Prepare messages
-            messages = []
-            if system_instruction:
-                messages.append({
-                    "role": "system",
-                    "content": system_instruction
-                })
+                # Prepare messages
+                messages = []
+                if system_instruction:
+                    messages.append({
+                        "role": "system",
+                        "content": system_instruction
+                    })
             
-            messages.append({
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{img_base64}"
+                messages.append({
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": prompt
+                        },
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{img_base64}"
+                            }
                         }
-                    }
-                ]
-            })
+                    ]
+                })
             
-            # Call Groq API with Llava vision model (currently available)
-            response = self.client.chat.completions.create(
-                model="llava-v1.5-7b-4096-preview",  # Llava 1.5 7B - currently available vision model
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1024
-            )
+                # Call Groq API with Llava vision model (currently available)
+                # Images are billed as prompt tokens too; settle() corrects the estimate
+                tokens = estimate_tokens(system_instruction, prompt, max_tokens=max_tokens) + IMAGE_TOKEN_ESTIMATE
+                response = groq_scheduler.call(lambda: self.client.chat.completions.create(
+                    model=VISION_MODEL,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=max_tokens
+                ), tokens)
+                groq_scheduler.settle(tokens, usage_tokens(response))
+                record_usage(span, response)
             
-            return response.choices[0].message.content
+                return response.choices[0].message.content
         
-        except Exception as e:
-            return f"Groq Vision Error: {str(e)}"
+            except Exception as e:
+                span.label(outcome="error")
+                span.set(error=str(e))
+                return f"Groq Vision Error: {str(e)}"
 
 groq_vision_client = GroqVisionClient()
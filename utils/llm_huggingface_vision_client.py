@@ -8,12 +8,14 @@ from PIL import Image
 import io
 import base64
 
+from utils.http_clients import get_session
+
 class HuggingFaceVisionClient:
     def __init__(self):
         # Using BLIP image captioning - free and works without auth
         self.api_url = "https://api-inference.huggingface.co/models/Salesforce/blip-image-captioning-large"
     
-    def get_vision_completion(self, prompt, image_data, system_instruction=None):
+    def get_vision_completion(self, prompt, image_data, system_instruction=None, max_tokens=None):
         """
         Get vision completion from HuggingFace BLIP model.
         
@@ -21,6 +23,7 @@ class HuggingFaceVisionClient:
             prompt: Text prompt for the vision task (used as context)
             image_data: PIL Image object
             system_instruction: Optional (ignored for this model)
+            max_tokens: Optional (ignored: captioning has a fixed length)
         
         Returns:
             Response text from the model
@@ -32,7 +35,7 @@ class HuggingFaceVisionClient:
             image_bytes = buffered.getvalue()
             
             # Call HuggingFace Inference API (FREE - no key needed)
-            response = requests.post(
+            response = get_session("huggingface").post(
                 self.api_url,
                 headers={"Content-Type": "application/octet-stream"},
                 data=image_bytes,
@@ -0,0 +1,303 @@
+"""
+Latency-aware router across text LLM providers (Groq, Gemini).
+
+- Tracks rolling p50/p95 latency and error rate per provider/model.
+- Orders healthy providers by observed latency (configured order until enough samples).
+- Sends a hedged request to the next provider when the primary runs past its p95.
+- Streams are held back until their first chunk: a provider that fails before it is
+  failed over, and one slower than its time-to-first-chunk p95 is hedged.
+- Trips a circuit breaker on a failing provider and probes it again after a cooldown.
+- Logs every routing decision (set LLM_ROUTER_LOG=path to write them as JSON lines).
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.llm_groq_client import GroqStreamError, is_error_response
+from utils.provider_health import MIN_SAMPLES, ProviderStats
+
+logger = logging.getLogger("llm_router")
+if os.getenv("LLM_ROUTER_LOG"):
+    _handler = logging.FileHandler(os.getenv("LLM_ROUTER_LOG"), encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+DEFAULT_HEDGE_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_SECONDS", "4"))
+MIN_HEDGE_SECONDS = 0.5
+COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+
+class Provider:
+    def __init__(self, name, model, factory, streams=False):
+        self.name = name
+        self.model = model
+        self._factory = factory
+        self._client = None
+        self.streams = streams
+        self.stats = ProviderStats(COOLDOWN_SECONDS)
+        # Time to first streamed chunk; only its latency percentiles are used
+        self.first_chunk_stats = ProviderStats(COOLDOWN_SECONDS)
+
+    @property
+    def key(self):
+        return f"{self.name}/{self.model}"
+
+    def client(self):
+        # Built on first use so a missing SDK or key only disables this provider
+        if self._client is None:
+            self._client = self._factory()
+        return self._client
+
+    def complete(self, prompt, system_instruction, temperature, max_tokens):
+        client = self.client()
+        if self.name == "groq":
+            return client.get_completion(prompt, system_instruction, temperature, max_tokens)
+        return client.get_completion(prompt, system_instruction=system_instruction)
+
+
+def _groq_factory():
+    from utils.llm_groq_async_client import groq_client
+    return groq_client
+
+
+def _gemini_factory():
+    from utils.llm_client import GeminiClient
+    return GeminiClient()
+
+
+class LLMRouter:
+    def __init__(self, providers=None, max_workers=16):
+        self.providers = providers or [
+            Provider("groq", "llama-3.1-8b-instant", _groq_factory, streams=True),
+            Provider("gemini", "gemini-2.0-flash", _gemini_factory),
+        ]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-router")
+
+    def _log(self, event, **fields):
+        logger.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, ensure_ascii=False))
+
+    def ranked_providers(self):
+        """
+        Healthy providers, fastest first (configured order until enough samples).
+        Ranking has no side effects; launching a request claims a half-open probe.
+        """
+        ranked = []
+        for index, provider in enumerate(self.providers):
+            if not provider.stats.available():
+                continue
+            snap = provider.stats.snapshot()
+            if snap["samples"] < MIN_SAMPLES or snap["p50"] is None:
+                score = 0.0
+            else:
+                # Penalise flaky providers: expected time to a good answer
+                score = snap["p50"] / max(0.05, 1 - snap["error_rate"])
+            ranked.append((score, index, provider))
+        ranked.sort(key=lambda item: (item[0], item[1]))
+        return [provider for _, _, provider in ranked]
+
+    def _hedge_delay(self, provider, stream=False):
+        stats = provider.first_chunk_stats if stream and provider.streams else provider.stats
+        snap = stats.snapshot()
+        if snap["p95"] is None or snap["samples"] < MIN_SAMPLES:
+            return DEFAULT_HEDGE_SECONDS
+        return max(MIN_HEDGE_SECONDS, snap["p95"])
+
+    def _run(self, provider, prompt, system_instruction, temperature, max_tokens):
+        start = time.monotonic()
+        try:
+            result = provider.complete(prompt, system_instruction, temperature, max_tokens)
+        except Exception as e:
+            result = f"Error: {provider.name}: {e}"
+        latency = time.monotonic() - start
+        ok = not is_error_response(result)
+        if provider.stats.record(latency, ok) == "opened":
+            self._log("breaker_open", provider=provider.key, error=result[:200])
+        return provider, result, ok, latency
+
+    def get_completion(self, prompt, system_instruction=None, temperature=0.7, max_tokens=1024):
+        """Same contract as GroqClient.get_completion: text, or an error string if every provider fails."""
+        candidates = self.ranked_providers()
+        if not candidates:
+            self._log("no_provider", providers=[p.key for p in self.providers])
+            return "Error: All LLM providers are temporarily unavailable."
+
+        args = (prompt, system_instruction, temperature, max_tokens)
+        running = {}
+        waiting = list(candidates)
+        hedged = False
+        last_error = "Error: No provider returned a response."
+
+        def launch(reason):
+            """Send to the next candidate that still allows a request; its hedge deadline, or None."""
+            while waiting:
+                provider = waiting.pop(0)
+                if not provider.stats.allow():
+                    # Its half-open probe was taken by another request since ranking
+                    continue
+                # Copy the context so the caller's rate-limit priority follows the call
+                running[self._executor.submit(contextvars.copy_context().run, self._run, provider, *args)] = provider
+                self._log("dispatch", provider=provider.key, reason=reason)
+                return time.monotonic() + self._hedge_delay(provider)
+            return None
+
+        hedge_deadline = launch("primary")
+        if hedge_deadline is None:
+            self._log("no_provider", providers=[p.key for p in self.providers])
+            return "Error: All LLM providers are temporarily unavailable."
+
+        while running:
+            timeout = None
+            if waiting:
+                timeout = max(0.0, hedge_deadline - time.monotonic())
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Primary is slower than its p95: race the next provider against it
+                hedged = True
+                hedge_deadline = launch("hedge") or hedge_deadline
+                continue
+
+            for future in done:
+                running.pop(future)
+                provider, result, ok, latency = future.result()
+                if ok:
+                    self._log("winner", provider=provider.key, latency_ms=round(latency * 1000),
+                              hedged=hedged, abandoned=[p.key for p in running.values()])
+                    return result
+                last_error = result
+                self._log("failure", provider=provider.key, latency_ms=round(latency * 1000), error=result[:200])
+
+            if not running and waiting:
+                # Fast failure: fail over immediately instead of waiting for the hedge timer
+                hedge_deadline = launch("failover") or hedge_deadline
+
+        return last_error
+
+    def _pump(self, attempt, provider, args, events, cancel):
+        """Feed one provider's answer into events as (attempt, kind, payload) until done or cancelled."""
+        start = time.monotonic()
+        try:
+            if provider.streams:
+                stream = provider.client().stream_completion(*args)
+                try:
+                    for index, piece in enumerate(stream):
+                        if cancel.is_set():
+                            return
+                        if index == 0:
+                            provider.first_chunk_stats.record(time.monotonic() - start, True)
+                        events.put((attempt, "chunk", piece))
+                finally:
+                    stream.close()
+            else:
+                result = provider.complete(*args)
+                if is_error_response(result):
+                    raise GroqStreamError(result)
+                events.put((attempt, "chunk", result))
+        except Exception as e:
+            if provider.stats.record(time.monotonic() - start, False) == "opened":
+                self._log("breaker_open", provider=provider.key, error=str(e)[:200])
+            events.put((attempt, "error", f"Error: {provider.name}: {e}"))
+            return
+        provider.stats.record(time.monotonic() - start, True)
+        events.put((attempt, "done", None))
+
+    def stream_completion(self, prompt, system_instruction=None, temperature=0.7, max_tokens=1024):
+        """
+        Stream the answer of the best healthy provider (streaming ones first; a
+        non-streaming one yields its answer in one piece). Nothing is yielded until a
+        provider produces its first chunk, so errors before that fail over and a slow
+        first chunk is hedged; the first provider to produce one wins. Raises
+        GroqStreamError when every provider fails, or when the winner fails mid-stream.
+        """
+        ranked = self.ranked_providers()
+        candidates = [p for p in ranked if p.streams] + [p for p in ranked if not p.streams]
+        if not candidates:
+            self._log("no_provider", providers=[p.key for p in self.providers])
+            raise GroqStreamError("Error: All LLM providers are temporarily unavailable.")
+
+        args = (prompt, system_instruction, temperature, max_tokens)
+        events = queue.Queue()
+        attempts = []   # attempt -> (provider, cancel event)
+        running = set()
+        waiting = list(candidates)
+        hedged = False
+        last_error = "Error: No provider returned a response."
+
+        def launch(reason):
+            """Start the next candidate that still allows a request; its hedge deadline, or None."""
+            while waiting:
+                provider = waiting.pop(0)
+                if not provider.stats.allow():
+                    continue
+                cancel = threading.Event()
+                attempts.append((provider, cancel))
+                running.add(len(attempts) - 1)
+                self._executor.submit(contextvars.copy_context().run, self._pump,
+                                      len(attempts) - 1, provider, args, events, cancel)
+                self._log("dispatch", provider=provider.key, reason=reason, stream=True)
+                return time.monotonic() + self._hedge_delay(provider, stream=True)
+            return None
+
+        start = time.monotonic()
+        hedge_deadline = launch("primary")
+        if hedge_deadline is None:
+            self._log("no_provider", providers=[p.key for p in self.providers])
+            raise GroqStreamError("Error: All LLM providers are temporarily unavailable.")
+        winner, first = None, None
+        while running and winner is None:
+            timeout = None
+            if waiting:
+                timeout = max(0.0, hedge_deadline - time.monotonic())
+            try:
+                attempt, kind, payload = events.get(timeout=timeout)
+            except queue.Empty:
+                # No first chunk within the primary's p95: race the next provider against it
+                hedged = True
+                hedge_deadline = launch("hedge") or hedge_deadline
+                continue
+            if attempt not in running:
+                continue
+            if kind == "error":
+                running.discard(attempt)
+                last_error = payload
+                self._log("failure", provider=attempts[attempt][0].key, error=payload[:200], reason="stream")
+                if not running and waiting:
+                    hedge_deadline = launch("failover") or hedge_deadline
+                continue
+            winner, first = attempt, (payload if kind == "chunk" else None)
+
+        if winner is None:
+            raise GroqStreamError(last_error)
+        for attempt in running - {winner}:
+            attempts[attempt][1].set()
+        provider, cancel = attempts[winner]
+        self._log("winner", provider=provider.key, first_chunk_ms=round((time.monotonic() - start) * 1000),
+                  hedged=hedged, abandoned=[attempts[a][0].key for a in running - {winner}], reason="stream")
+        if first is None:
+            return
+        try:
+            yield first
+            while True:
+                attempt, kind, payload = events.get()
+                if attempt != winner:
+                    continue
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise GroqStreamError(payload)
+                yield payload
+        finally:
+            cancel.set()
+
+    def stats(self):
+        return {provider.key: provider.stats.snapshot() for provider in self.providers}
+
+
+llm_router = LLMRouter()
@@ -0,0 +1,249 @@
+"""
+Lightweight in-process metrics for the app's hot paths.
+
+- Timers record duration plus an outcome (ok / error / cache_hit ...), and each
+  one is also written as a JSON log line with any extra fields
+  (tokens, bytes, model, ...). Errors are logged at WARNING, not swallowed.
+- Counters accumulate totals such as tokens or audio bytes.
+- Percentiles come from a rolling window of recent samples per series.
+- render_prometheus() gives the Prometheus text format. With METRICS_PORT set,
+  serve_from_env() exposes it at http://host:PORT/metrics.
+
+Usage:
+    with metrics.timer("llm_completion", model=model) as span:
+        ...
+        span.label(outcome="cache_hit")   # labels become part of the series
+        span.set(prompt_tokens=120)       # fields only go to the JSON log
+
+Configuration (environment):
+    METRICS_LOG     write the JSON events to this file
+    METRICS_PORT    serve /metrics on this port (see serve_from_env)
+    METRICS_WINDOW  samples kept per series for percentiles (default 1024)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("metrics")
+if os.getenv("METRICS_LOG"):
+    _handler = logging.FileHandler(os.getenv("METRICS_LOG"), encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+WINDOW = int(os.getenv("METRICS_WINDOW", "1024"))
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Series:
+    """Count, sum and a rolling window of one labelled timer/histogram."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.window = deque(maxlen=WINDOW)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.window.append(value)
+
+
+class Span:
+    """Handle yielded by MetricsRegistry.timer()."""
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = dict(labels)
+        self.fields = {}
+        self.start = time.perf_counter()
+
+    def label(self, **labels):
+        self.labels.update(labels)
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+class _Timer:
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.span = Span(name, labels)
+
+    def __enter__(self):
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        if exc_type is GeneratorExit:
+            span.labels.setdefault("outcome", "cancelled")
+        elif exc_type is not None:
+            span.labels["outcome"] = "error"
+            span.fields.setdefault("error", f"{exc_type.__name__}: {exc}")
+        span.labels.setdefault("outcome", "ok")
+        self.registry.record(span)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._counters = {}
+
+    def timer(self, name, **labels):
+        """Context manager timing the block as series `name`; exceptions are recorded and re-raised."""
+        return _Timer(self, name, labels)
+
+    def record(self, span):
+        duration = span.elapsed()
+        self.observe(f"{span.name}_seconds", duration, **span.labels)
+        event = {"ts": round(time.time(), 3), "metric": span.name,
+                 "duration_ms": round(duration * 1000, 2), **span.labels, **span.fields}
+        if span.labels.get("outcome") == "error":
+            logger.warning(json.dumps(event, ensure_ascii=False, default=str))
+        else:
+            logger.info(json.dumps(event, ensure_ascii=False, default=str))
+
+    def observe(self, name, value, **labels):
+        """Add one sample (seconds, bytes, tokens, ...) to a histogram series."""
+        key = _key(name, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = Series()
+            series.add(float(value))
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """{"series": [...], "counters": [...]} with percentiles over each series' window."""
+        with self._lock:
+            series = [(key, s.count, s.total, s.max, sorted(s.window)) for key, s in self._series.items()]
+            counters = list(self._counters.items())
+        rows = []
+        for (name, labels), count, total, peak, window in sorted(series):
+            row = {"name": name, "labels": dict(labels), "count": count, "sum": total, "max": peak}
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}"] = _percentile(window, q)
+            rows.append(row)
+        return {
+            "series": rows,
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(counters)]
+        }
+
+    def render_prometheus(self):
+        """Everything in the Prometheus text exposition format (timers as summaries)."""
+        snap = self.snapshot()
+        lines = []
+        typed = set()
+        for row in snap["series"]:
+            name = row["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            for q in QUANTILES:
+                value = row[f"p{int(q * 100)}"]
+                if value is not None:
+                    lines.append(f"{name}{_labels(row['labels'], quantile=q)} {value:.6g}")
+            lines.append(f"{name}_sum{_labels(row['labels'])} {row['sum']:.6g}")
+            lines.append(f"{name}_count{_labels(row['labels'])} {row['count']}")
+        for row in snap["counters"]:
+            name = f"{row['name']}_total"
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_labels(row['labels'])} {row['value']:.6g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._counters.clear()
+
+
+def _labels(labels, **extra):
+    items = {**labels, **{k: str(v) for k, v in extra.items()}}
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(items.items()))
+    return "{" + body + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+metrics = MetricsRegistry()
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serve GET /metrics (Prometheus text) and /metrics.json on a daemon thread. Idempotent."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics":
+                    body, ctype = metrics.render_prometheus(), "text/plain; version=0.0.4"
+                elif path == "/metrics.json":
+                    body, ctype = json.dumps(metrics.snapshot()), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        _server = ThreadingHTTPServer((host, int(port)), Handler)
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
+
+
+def serve_from_env():
+    """Start the /metrics endpoint if METRICS_PORT is set; None otherwise (or if the port is taken)."""
+    port = os.getenv("METRICS_PORT")
+    if not port:
+        return None
+    try:
+        return start_http_server(port)
+    except OSError as e:
+        logger.warning("metrics endpoint not started on port %s: %s", port, e)
+        return None
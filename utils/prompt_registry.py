@@ -0,0 +1,256 @@
+"""
+Registry of the prompt templates in prompts/.
+
+- Every template is read and compiled once into literal/placeholder segments.
+  Rendering joins them without re-reading or re-parsing the file.
+- Files are checked for changes at most every PROMPT_RELOAD_SECONDS, and edited
+  templates are recompiled in place (hot reload, no app restart).
+- validate() compares each template's placeholders with the keyword arguments
+  at every call site in the given source files. It reports a KeyError before a
+  farmer hits it, e.g. a template asking for {soil_type} while a call passes soil=.
+- A missing template or a missing field raises instead of silently becoming "".
+
+Configuration (environment):
+    PROMPTS_DIR             template directory (default prompts)
+    PROMPT_RELOAD_SECONDS   how often to look for edited files; 0 disables hot reload (default 2)
+"""
+
+import logging
+import os
+import string
+import threading
+import time
+
+from utils.metrics import metrics
+
+logger = logging.getLogger("prompt_registry")
+
+PROMPTS_DIR = os.getenv("PROMPTS_DIR", "prompts")
+RELOAD_SECONDS = float(os.getenv("PROMPT_RELOAD_SECONDS", "2"))
+
+# Startup validation waits this long so it does not compete with the first page render
+VALIDATE_DELAY_SECONDS = 1.0
+
+# Functions whose first argument names a template file
+LOADERS = {"load_prompt", "_read_prompt", "text", "get"}
+
+
+class PromptError(Exception):
+    """A template is missing or cannot be compiled."""
+
+
+class PromptFieldError(PromptError, KeyError):
+    """A render call did not supply every placeholder (a KeyError, like str.format)."""
+
+    def __str__(self):
+        return self.args[0] if self.args else ""
+
+
+class CompiledTemplate:
+    """A str.format template split once into (literal, field) segments."""
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self._parts = []
+        try:
+            for literal, field, spec, conversion in string.Formatter().parse(text):
+                if field is not None and (spec or conversion or not field.isidentifier()):
+                    raise PromptError(f"{name}: only plain {{name}} placeholders are supported, got {{{field}}}")
+                self._parts.append((literal, field))
+        except ValueError as e:
+            raise PromptError(f"{name}: {e}") from e
+        self.fields = frozenset(field for _, field in self._parts if field)
+
+    def render(self, /, **values):
+        missing = self.fields - values.keys()
+        if missing:
+            raise PromptFieldError(f"{self.name}: missing placeholder values {', '.join(sorted(missing))}")
+        return "".join(literal + (str(values[field]) if field else "") for literal, field in self._parts)
+
+
+class PromptRegistry:
+    def __init__(self, directory=PROMPTS_DIR, reload_seconds=RELOAD_SECONDS):
+        self.directory = directory
+        self.reload_seconds = reload_seconds
+        self._templates = {}  # name -> CompiledTemplate
+        self._stamps = {}     # name -> (mtime_ns, size)
+        self._errors = {}     # name -> compile error of its current file
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self.stats = {"loads": 0, "reloads": 0}
+
+    def _scan(self):
+        """Compile every new or changed file; drop deleted ones."""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".txt")]
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if self._stamps.get(name) == stamp:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            try:
+                template = CompiledTemplate(name, text)
+            except PromptError as e:
+                # Keep serving the last good version of an edited template
+                logger.error("Not loading %s", e)
+                self._errors[name] = str(e)
+                self._stamps[name] = stamp
+                continue
+            self._errors.pop(name, None)
+            reloaded = name in self._templates
+            self._templates[name] = template
+            self._stamps[name] = stamp
+            self.stats["reloads" if reloaded else "loads"] += 1
+            if reloaded:
+                logger.info("Reloaded prompt template %s", name)
+                metrics.inc("prompt_reloads", template=name)
+        for name in set(self._stamps) - set(names):
+            self._templates.pop(name, None)
+            self._stamps.pop(name, None)
+            self._errors.pop(name, None)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and (self.reload_seconds <= 0 or now - self._checked_at < self.reload_seconds):
+            return
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= self.reload_seconds > 0:
+                self._scan()
+                self._checked_at = now
+
+    def get(self, name):
+        """CompiledTemplate for prompts/<name>; raises PromptError if there is no such file."""
+        self._refresh()
+        template = self._templates.get(name)
+        if template is None:
+            raise PromptError(f"Prompt template not found: {os.path.join(self.directory, name)}")
+        return template
+
+    def text(self, name):
+        return self.get(name).text
+
+    def render(self, name, /, **values):
+        return self.get(name).render(**values)
+
+    def names(self):
+        self._refresh()
+        return sorted(self._templates)
+
+    def validate(self, source_paths=()):
+        """
+        Problems found in the templates and at their call sites, as strings (empty if none).
+        A call site is any call with a template file name literal among its arguments
+        (load_prompt("x.txt"), plan_prompt(..., load_prompt("x.txt"), ..., field=...),
+        load_prompt("x.txt").format(field=...)). Its keyword arguments are compared
+        with the template's placeholders.
+        """
+        templates = {name: self.get(name) for name in self.names()}
+        problems = list(self._errors.values())
+        for path in source_paths:
+            for lineno, names, keywords, open_ended in _call_sites(path):
+                where = f"{os.path.relpath(path)}:{lineno}"
+                rendered = []
+                for name in names:
+                    template = templates.get(name)
+                    if template is None:
+                        problems.append(f"{where}: template {name} does not exist")
+                    elif template.fields and keywords is not None:
+                        rendered.append(template)
+                for template in rendered:
+                    missing = template.fields - keywords
+                    if missing and not open_ended:
+                        problems.append(f"{where}: {template.name} needs {', '.join(sorted(missing))}, not passed")
+                if len(rendered) == 1:
+                    unused = keywords - rendered[0].fields
+                    if unused:
+                        problems.append(f"{where}: {rendered[0].name} has no placeholder for {', '.join(sorted(unused))}")
+        return problems
+
+
+def _template_name(node, ast):
+    """"x.txt" if node is loader("x.txt"), else None."""
+    if not isinstance(node, ast.Call):
+        return None
+    func = node.func
+    func_name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+    if func_name not in LOADERS or not node.args:
+        return None
+    arg = node.args[0]
+    if isinstance(arg, ast.Constant) and isinstance(arg.value, str) and arg.value.endswith(".txt"):
+        return arg.value
+    return None
+
+
+def _call_sites(path):
+    """Yield (lineno, template names, keyword names or None, has **kwargs) for each render call in path."""
+    import ast  # only needed when validating
+
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    if ".txt" not in source:
+        return  # skip parsing files that cannot reference a template
+    tree = ast.parse(source, filename=path)
+    rendered = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        # loader("x.txt").format(...) and registry.render("x.txt", ...)
+        if isinstance(node.func, ast.Attribute) and node.func.attr == "format":
+            name = _template_name(node.func.value, ast)
+            names = [name] if name else []
+        elif isinstance(node.func, ast.Attribute) and node.func.attr == "render":
+            arg = node.args[0] if node.args else None
+            is_name = isinstance(arg, ast.Constant) and isinstance(arg.value, str) and arg.value.endswith(".txt")
+            names = [arg.value] if is_name else []
+        else:
+            names = [name for name in (_template_name(arg, ast) for arg in node.args) if name]
+        if not names:
+            continue
+        rendered.update(id(arg) for arg in ast.walk(node) if arg is not node)
+        keywords = {kw.arg for kw in node.keywords if kw.arg}
+        open_ended = any(kw.arg is None for kw in node.keywords)
+        yield node.lineno, names, keywords, open_ended
+    # Bare loads (e.g. the system prompt passed through a variable) only need to exist
+    for node in ast.walk(tree):
+        if id(node) not in rendered:
+            name = _template_name(node, ast)
+            if name:
+                yield node.lineno, [name], None, False
+
+
+prompt_registry = PromptRegistry()
+
+
+def source_files(directories):
+    return [os.path.join(d, name) for d in directories for name in sorted(os.listdir(d)) if name.endswith(".py")]
+
+
+def validate_in_background(directories, registry=None, delay=VALIDATE_DELAY_SECONDS):
+    """Run validate() over the .py files in directories on a daemon thread after delay seconds;
+    problems are logged as errors."""
+    registry = registry or prompt_registry
+
+    def run():
+        try:
+            problems = registry.validate(source_files(directories))
+        except Exception as e:
+            logger.error("Prompt validation failed: %s", e)
+            return
+        for problem in problems:
+            logger.error("Prompt template problem: %s", problem)
+        metrics.inc("prompt_validation_problems", len(problems))
+
+    timer = threading.Timer(delay, run)
+    timer.name = "prompt-validation"
+    timer.daemon = True
+    timer.start()
+    return timer
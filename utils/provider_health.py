@@ -0,0 +1,107 @@
+"""
+Rolling latency/outcome statistics and a circuit breaker per upstream provider.
+Shared by the LLM router (utils.llm_router) and the TTS router (utils.tts_backends).
+"""
+
+import threading
+import time
+from collections import deque
+
+WINDOW = 100                 # samples kept per provider
+MIN_SAMPLES = 5              # before latency stats are trusted
+FAILURE_THRESHOLD = 3        # consecutive failures that open the breaker
+ERROR_RATE_THRESHOLD = 0.5   # or this error rate over the window
+DEFAULT_COOLDOWN_SECONDS = 30.0
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ProviderStats:
+    """
+    Rolling latency/outcome window plus circuit breaker state for one provider.
+    With max_age_seconds, samples older than that are forgotten, so a provider
+    that stopped receiving traffic because it looked slow is trusted again later.
+    """
+
+    def __init__(self, cooldown_seconds=DEFAULT_COOLDOWN_SECONDS, max_age_seconds=None):
+        self.cooldown_seconds = cooldown_seconds
+        self.max_age_seconds = max_age_seconds
+        self.samples = deque(maxlen=WINDOW)  # (recorded_at, latency_seconds, ok)
+        self.consecutive_failures = 0
+        self.state = "closed"                # closed | open | half_open
+        self.opened_at = 0.0
+        self.probe_started = None            # set while the half-open probe is out
+        self.lock = threading.Lock()
+
+    def _expire(self, now):
+        if self.max_age_seconds is not None:
+            while self.samples and now - self.samples[0][0] > self.max_age_seconds:
+                self.samples.popleft()
+
+    def record(self, latency, ok):
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            self.samples.append((now, latency, ok))
+            self.probe_started = None
+            if ok:
+                self.consecutive_failures = 0
+                self.state = "closed"
+                return None
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= FAILURE_THRESHOLD or (
+                    len(self.samples) >= MIN_SAMPLES * 2 and self._error_rate() > ERROR_RATE_THRESHOLD):
+                self.state = "open"
+                self.opened_at = now
+                return "opened"
+            return None
+
+    def _allows(self, now):
+        if self.state == "open":
+            return now - self.opened_at >= self.cooldown_seconds
+        if self.state == "half_open":
+            return self.probe_started is None or now - self.probe_started >= self.cooldown_seconds
+        return True
+
+    def available(self):
+        """True if allow() would let a request through now. No side effects: use it for ranking."""
+        with self.lock:
+            return self._allows(time.monotonic())
+
+    def allow(self):
+        """
+        Call right before sending a request; True if it may be sent.
+        Moves open -> half_open after the cooldown. Half-open lets one probe through
+        at a time, and this call claims it; a probe that never reports back is given
+        up on after another cooldown.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if not self._allows(now):
+                return False
+            if self.state != "closed":
+                self.state = "half_open"
+                self.probe_started = now
+            return True
+
+    def _error_rate(self):
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+    def snapshot(self):
+        with self.lock:
+            self._expire(time.monotonic())
+            latencies = sorted(lat for _, lat, ok in self.samples if ok)
+            return {
+                "state": self.state,
+                "samples": len(self.samples),
+                "p50": _percentile(latencies, 0.50),
+                "p95": _percentile(latencies, 0.95),
+                "error_rate": round(self._error_rate(), 3)
+            }
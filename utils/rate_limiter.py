@@ -0,0 +1,209 @@
+"""
+Priority-aware rate-limit scheduler shared by every Groq-backed call
+(text completions, vision, Whisper transcription).
+
+- Two token buckets cover the account quota: requests per minute and tokens per minute.
+- Waiters are served in priority order: interactive UI calls before background work.
+  Background work also leaves a slice of each bucket free for interactive calls.
+- A 429 pauses the whole scheduler for the Retry-After interval (exponential
+  backoff with jitter when the header is missing), then the call is retried.
+
+Configuration (environment):
+    GROQ_RPM                 requests per minute (default 30)
+    GROQ_TPM                 tokens per minute (default 6000)
+    GROQ_BACKGROUND_RESERVE  fraction of each bucket background work may not use (default 0.2)
+    GROQ_MAX_RETRIES         429 retries per call (default 4)
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+
+from utils.token_budget import count_tokens
+
+logger = logging.getLogger("rate_limiter")
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+RPM = float(os.getenv("GROQ_RPM", "30"))
+TPM = float(os.getenv("GROQ_TPM", "6000"))
+BACKGROUND_RESERVE = float(os.getenv("GROQ_BACKGROUND_RESERVE", "0.2"))
+MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "4"))
+MAX_BACKOFF_SECONDS = 60.0
+
+_priority = contextvars.ContextVar("groq_priority", default=INTERACTIVE)
+
+
+def current_priority():
+    return _priority.get()
+
+
+@contextlib.contextmanager
+def background_priority():
+    """Run the enclosed Groq calls (in this thread/context) as background work."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(*texts, max_tokens=0):
+    """Pre-call token count: local tokenizer estimate of the prompt plus the completion budget."""
+    return sum(count_tokens(text) for text in texts) + 1 + int(max_tokens or 0)
+
+
+def is_rate_limited(exc):
+    return getattr(exc, "status_code", None) == 429
+
+
+def retry_after_seconds(exc):
+    """Retry-After from a 429 response, in seconds, or None."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class TokenBucket:
+    """Continuously refilled bucket. The level may go negative after a usage correction."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, reserve):
+        """Seconds until amount can be taken while leaving reserve behind (0 if now)."""
+        needed = min(amount, self.capacity * (1 - reserve)) + self.capacity * reserve
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+
+class RateLimitScheduler:
+    def __init__(self, rpm=RPM, tpm=TPM, background_reserve=BACKGROUND_RESERVE, max_retries=MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.background_reserve = background_reserve
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._waiters = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self.stats = {"granted": 0, "waited": 0, "wait_seconds": 0.0, "rate_limited": 0}
+
+    def acquire(self, tokens=0, priority=None):
+        """Block until one request and `tokens` tokens may be spent."""
+        priority = current_priority() if priority is None else priority
+        reserve = self.background_reserve if priority == BACKGROUND else 0.0
+        ticket = (priority, next(self._seq))
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    timeout = None
+                    if self._waiters[0] == ticket:
+                        now = time.monotonic()
+                        self.requests.refill(now)
+                        self.tokens.refill(now)
+                        timeout = max(
+                            self._paused_until - now,
+                            self.requests.wait_time(1, reserve),
+                            self.tokens.wait_time(tokens, reserve)
+                        )
+                        if timeout <= 0:
+                            self.requests.level -= 1
+                            self.tokens.level -= min(tokens, self.tokens.capacity)
+                            break
+                    self._cond.wait(timeout)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            self.stats["granted"] += 1
+            if waited > 0.01:
+                self.stats["waited"] += 1
+                self.stats["wait_seconds"] += waited
+
+    def settle(self, estimated, actual):
+        """Correct the token bucket once the real usage of a call is known."""
+        if actual is None:
+            return
+        with self._cond:
+            self.tokens.level += min(estimated, self.tokens.capacity) - actual
+            self._cond.notify_all()
+
+    def _backoff(self, exc, attempt):
+        delay = retry_after_seconds(exc)
+        if delay is None:
+            delay = min(MAX_BACKOFF_SECONDS, 2 ** attempt) * random.uniform(0.5, 1.0)
+        with self._cond:
+            # Everyone shares the quota, so everyone waits
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.stats["rate_limited"] += 1
+            self._cond.notify_all()
+        logger.warning("Groq 429, retry %d/%d in %.1fs", attempt + 1, self.max_retries, delay)
+
+    def call(self, fn, tokens=0, priority=None):
+        """Run fn() under the limits, retrying 429s. Returns fn's result."""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens, priority)
+            try:
+                return fn()
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                # A rejected request used no tokens
+                self.settle(tokens, 0)
+                if attempt == self.max_retries:
+                    raise
+                self._backoff(e, attempt)
+
+    async def acall(self, coro_fn, tokens=0, priority=None):
+        """Async variant of call(); waiting happens off the event loop."""
+        priority = current_priority() if priority is None else priority
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            await loop.run_in_executor(None, functools.partial(self.acquire, tokens, priority))
+            try:
+                return await coro_fn()
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                self.settle(tokens, 0)
+                if attempt == self.max_retries:
+                    raise
+                self._backoff(e, attempt)
+
+
+def usage_tokens(response):
+    """total_tokens from a chat completion response or final stream chunk, if reported."""
+    usage = getattr(response, "usage", None) or getattr(getattr(response, "x_groq", None), "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+groq_scheduler = RateLimitScheduler()
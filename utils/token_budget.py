@@ -0,0 +1,266 @@
+"""
+Per-mode token budgets and prompt compaction for the text LLM calls.
+
+- max_tokens is set per mode instead of a flat 1024: Smart Talk answers are
+  spoken and capped at ~100 words. Hindi gets more because Devanagari costs
+  more tokens per word.
+- Templates are compacted once per (template, mode). Whitespace is normalised.
+  Instructions the mode makes redundant are dropped (e.g. the markdown output
+  format for spoken answers). Paragraphs carrying {placeholders} move to the
+  end, so the system prompt plus the static part of each template form a
+  byte-identical prefix across requests and languages.
+- Prompt tokens are counted with a local tokenizer: tiktoken when installed,
+  otherwise a script-aware estimate tuned for English and Devanagari.
+- llm_mode() tags the calls in a block so token usage is reported per mode.
+
+Configuration (environment):
+    LLM_MAX_TOKENS_<MODE>   override a mode's English budget, e.g. LLM_MAX_TOKENS_SMART_TALK=160
+"""
+
+import contextlib
+import contextvars
+import math
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+from importlib.util import find_spec
+
+from utils.metrics import metrics
+from utils.prompt_registry import CompiledTemplate
+
+ModeBudget = namedtuple("ModeBudget", ["max_tokens", "words", "drop_sections"])
+PromptPlan = namedtuple("PromptPlan", ["system", "prompt", "max_tokens", "prompt_tokens"])
+
+# English completion budgets; `words` adds an explicit length instruction
+MODE_BUDGETS = {
+    "crop": ModeBudget(max_tokens=500, words=None, drop_sections=()),
+    "irrigation": ModeBudget(max_tokens=450, words=None, drop_sections=()),
+    "tracking": ModeBudget(max_tokens=320, words=None, drop_sections=()),
+    "disease": ModeBudget(max_tokens=450, words=None, drop_sections=()),
+    # Spoken answers: markdown layout is stripped before TTS anyway
+    "smart_talk": ModeBudget(max_tokens=200, words=100, drop_sections=("output format",)),
+}
+DEFAULT_MAX_TOKENS = 1024
+HINDI_FACTOR = 2.0
+
+LANGUAGE_INSTRUCTIONS = {
+    "en": "Respond ONLY in ENGLISH.",
+    "hi": "Respond ONLY in HINDI.",
+}
+
+# Single-turn calls: nothing to keep context across
+SYSTEM_REDUNDANT = [re.compile(r"^\d+\.\s*Context:", re.IGNORECASE)]
+# Made redundant by the explicit word limit of modes that set one
+CONCISION = re.compile(r"\b(be (incredibly )?concise|keep it short)\b", re.IGNORECASE)
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+_NUMBERED = re.compile(r"^(\d+)\.(\s)")
+_CONTINUATION = set("#-*([0123456789")
+
+_mode = contextvars.ContextVar("llm_mode", default=None)
+
+
+def current_mode():
+    return _mode.get()
+
+
+@contextlib.contextmanager
+def llm_mode(mode):
+    """Tag the LLM calls made in this block (this thread/context) with a mode for usage reporting."""
+    token = _mode.set(mode)
+    try:
+        yield
+    finally:
+        _mode.reset(token)
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    # Llama 3's tokenizer extends cl100k, so this is a close count when tiktoken is available
+    if find_spec("tiktoken") is None:
+        return None
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+_PIECE = re.compile(
+    r"[\u0900-\u097F]+"            # Devanagari (letters, matras and danda together)
+    r"| ?[A-Za-z]+"                # Latin word with its leading space
+    r"| ?\d{1,3}"                  # numbers split in groups of three
+    r"| ?[^\W\d_]+"                # other scripts
+    r"| ?[^\s\w\u0900-\u097F]+"    # punctuation / markdown runs
+    r"|\s+"
+)
+
+
+def _estimate(text):
+    tokens = 0
+    for match in _PIECE.finditer(text):
+        piece = match.group()
+        stripped = piece.lstrip(" ")
+        if not stripped:
+            tokens += 1                                   # whitespace run
+        elif "\u0900" <= stripped[0] <= "\u097f":
+            tokens += math.ceil(len(stripped) / 2)
+        elif stripped[0].isascii() and stripped[0].isalpha():
+            tokens += 1 + len(stripped) // 8
+        elif stripped[0].isdigit():
+            tokens += 1
+        elif stripped[0].isalpha():
+            tokens += math.ceil(len(stripped) / 2)
+        elif stripped.isspace():
+            tokens += 1
+        else:
+            tokens += math.ceil(len(stripped) / 2)
+    return tokens
+
+
+def count_tokens(text):
+    """Prompt tokens in text, counted locally."""
+    if not text:
+        return 0
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return _estimate(text)
+
+
+def max_tokens_for(mode, lang="en"):
+    budget = MODE_BUDGETS.get(mode)
+    base = budget.max_tokens if budget else DEFAULT_MAX_TOKENS
+    base = int(os.getenv(f"LLM_MAX_TOKENS_{mode.upper()}", base))
+    if lang == "hi":
+        base = int(base * HINDI_FACTOR)
+    return min(base, DEFAULT_MAX_TOKENS * 2)
+
+
+def _clean_lines(text):
+    lines = []
+    for line in text.strip().splitlines():
+        line = line.rstrip()
+        stripped = line.lstrip()
+        # Keep one level of indentation for sub-bullets
+        lines.append(("  " if stripped and len(line) > len(stripped) else "") + " ".join(stripped.split()))
+    return lines
+
+
+def _paragraphs(text):
+    paragraphs, current = [], []
+    for line in _clean_lines(text):
+        if line:
+            current.append(line)
+        elif current:
+            paragraphs.append(current)
+            current = []
+    if current:
+        paragraphs.append(current)
+    return paragraphs
+
+
+def _renumber(lines):
+    out, n = [], 0
+    for line in lines:
+        if _NUMBERED.match(line):
+            n += 1
+            line = _NUMBERED.sub(lambda m: f"{n}.{m.group(2)}", line, count=1)
+        out.append(line)
+    return out
+
+
+@lru_cache(maxsize=8)
+def compact_system(system_prompt):
+    """System prompt with normalised whitespace and instructions that never apply dropped."""
+    paragraphs = []
+    for lines in _paragraphs(system_prompt):
+        kept, skipping = [], False
+        for line in lines:
+            if any(pattern.match(line) for pattern in SYSTEM_REDUNDANT):
+                skipping = True
+                continue
+            # Sub-bullets of a dropped rule go with it
+            if skipping and line.startswith("  "):
+                continue
+            skipping = False
+            kept.append(line)
+        if kept:
+            paragraphs.append("\n".join(_renumber(kept)))
+    return "\n\n".join(paragraphs)
+
+
+def _sections(text):
+    """Paragraphs grouped under their heading ("Output Format:", "TASK: ..."); continuation
+    paragraphs (markdown headers, bullets, brackets) stay with the section above them."""
+    sections = []
+    for lines in _paragraphs(text):
+        if sections and lines[0][:1] in _CONTINUATION:
+            sections[-1].append(lines)
+        else:
+            sections.append([lines])
+    return sections
+
+
+def _section_name(section):
+    return section[0][0].split(":")[0].strip("#* ").lower()
+
+
+@lru_cache(maxsize=64)
+def compact_template(template, mode):
+    """
+    Template reordered and trimmed for mode: static sections first, sections
+    with placeholders last, duplicate and mode-redundant lines removed.
+    Still a str.format template.
+    """
+    budget = MODE_BUDGETS.get(mode)
+    drop = budget.drop_sections if budget else ()
+    static, dynamic = [], []
+    seen = set()
+    for section in _sections(template):
+        if _section_name(section) in drop:
+            continue
+        paragraphs = []
+        for lines in section:
+            kept = []
+            for line in lines:
+                key = " ".join(line.lower().split())
+                if key in seen and not _PLACEHOLDER.search(line):
+                    continue
+                if budget and budget.words and CONCISION.search(line) and not _PLACEHOLDER.search(line):
+                    continue
+                seen.add(key)
+                kept.append(line)
+            if kept:
+                paragraphs.append("\n".join(_renumber(kept) if len(kept) < len(lines) else kept))
+        if not paragraphs:
+            continue
+        text = "\n\n".join(paragraphs)
+        (dynamic if _PLACEHOLDER.search(text) else static).append(text)
+    return "\n\n".join(static + dynamic)
+
+
+@lru_cache(maxsize=64)
+def _compiled(template, mode):
+    return CompiledTemplate(f"{mode} prompt", compact_template(template, mode))
+
+
+def plan_prompt(mode, system_prompt, template, lang="en", **fields):
+    """
+    Build the messages and completion budget for one call.
+
+    Returns PromptPlan(system, prompt, max_tokens, prompt_tokens). The language
+    and length instructions go at the very end of the prompt so everything
+    before the inputs is shared by every request in that mode.
+    """
+    prompt = _compiled(template, mode).render(**fields)
+    tail = [LANGUAGE_INSTRUCTIONS.get(lang, LANGUAGE_INSTRUCTIONS["en"])]
+    budget = MODE_BUDGETS.get(mode)
+    if budget and budget.words:
+        tail.append(f"Be concise and practical. MAX {budget.words} WORDS.")
+    prompt = prompt + "\n\n" + " ".join(tail)
+    system = compact_system(system_prompt)
+    prompt_tokens = count_tokens(system) + count_tokens(prompt)
+    metrics.observe("llm_prompt_tokens_estimated", prompt_tokens, mode=mode)
+    return PromptPlan(system, prompt, max_tokens_for(mode, lang), prompt_tokens)
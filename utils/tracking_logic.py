@@ -1,66 +1,112 @@
+import json
+import os
+import re
+import unicodedata
+from collections import namedtuple
 from datetime import datetime, date
+from functools import lru_cache
 
-# Simple crop stage logic based on days
-# This is a general approximation. Real logic would depend on specific crop type.
-STAGES = {
-    "Wheat": [
-        (0, 7, "Germination"),
-        (8, 25, "Crown Root Initiation"),
-        (26, 45, "Tillering"),
-        (46, 65, "Jointing"),
-        (66, 85, "Flowering"),
-        (86, 105, "Milking"),
-        (106, 120, "Dough"),
-        (121, 140, "Maturity")
-    ],
-    "Rice": [
-        (0, 10, "Germination"),
-        (11, 30, "Seedling"),
-        (31, 60, "Tillering"),
-        (61, 90, "Panicle Initiation"),
-        (91, 110, "Flowering"),
-        (111, 140, "Grain Filling"),
-        (141, 150, "Maturity")
-    ],
-    "General": [
-        (0, 15, "Germination/Seedling"),
-        (16, 45, "Vegetative Growth"),
-        (46, 75, "Flowering/Reproductive"),
-        (76, 105, "Fruit Setting/Grain Filling"),
-        (106, 140, "Maturity/Harvest")
-    ]
-}
-
-def calculate_crop_age(plantation_date_str):
+from utils.weather_provider import MockWeatherProvider, bucket_location, weather_service
+
+# Crop calendars (stage day ranges + name aliases) live in data/crop_calendar.json.
+# These are general approximations; local varieties and sowing windows differ.
+CROP_CALENDAR_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "crop_calendar.json")
+
+# Longest alias phrase, in words, tried when scanning free text
+MAX_ALIAS_WORDS = 3
+
+def normalize_crop_text(text):
+    """
+    Canonical form shared by aliases and user input: lowercase, punctuation removed,
+    common Devanagari and Hinglish spelling variants folded together.
+    """
+    text = unicodedata.normalize("NFC", str(text)).lower()
+    # Chandrabindu -> anusvara, drop nukta (गेहूँ/गेहूं, उड़द/उडद)
+    text = text.replace("\u0901", "\u0902").replace("\u093c", "")
+    # Long-vowel Hinglish spellings (pyaaz/pyaz, gehoon/gehun, kheera/khira)
+    text = text.replace("aa", "a").replace("ee", "i").replace("oo", "u")
+    return " ".join(re.split(r"[^\w\u0900-\u097f]+", text)).strip()
+
+def load_crop_calendar(path=CROP_CALENDAR_FILE):
+    """
+    Load calendars and build the alias index.
+
+    Returns:
+        (stages, alias_index, default_key) where stages maps crop key -> [(start, end, name), ...]
+        and alias_index maps normalized alias -> crop key
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        calendar = json.load(f)
+
+    stages = {}
+    alias_index = {}
+    for key, entry in calendar["crops"].items():
+        schedule = [tuple(stage) for stage in entry["stages"]]
+        # Bulk lookup relies on contiguous ranges starting at day 0
+        expected_start = 0
+        for start, end, name in schedule:
+            if start != expected_start or end < start:
+                raise ValueError(f"Crop calendar for {key} has a gap or overlap at '{name}'")
+            expected_start = end + 1
+        stages[key] = schedule
+        for alias in [key] + entry.get("aliases", []):
+            alias_index.setdefault(normalize_crop_text(alias), key)
+    return stages, alias_index, calendar.get("default", "General")
+
+STAGES, CROP_ALIASES, DEFAULT_CROP_KEY = load_crop_calendar()
+
+HARVESTED_STAGE = "Harvested / Post-Maturity"
+
+# The only accepted plantation date format, in both the scalar and bulk paths
+ISO_DATE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+def calculate_crop_age(plantation_date_str, today=None):
     """
     Calculate age in days.
     plantation_date_str: "YYYY-MM-DD"
+    today: override for deterministic runs (defaults to date.today())
     """
     try:
-        if isinstance(plantation_date_str, date):
+        if isinstance(plantation_date_str, datetime):
+            # Same as the bulk path: the calendar day, time of day dropped
+            p_date = plantation_date_str.date()
+        elif isinstance(plantation_date_str, date):
             p_date = plantation_date_str
         else:
+            if not ISO_DATE.fullmatch(str(plantation_date_str)):
+                raise ValueError(f"expected YYYY-MM-DD, got {plantation_date_str!r}")
             p_date = datetime.strptime(plantation_date_str, "%Y-%m-%d").date()
             
-        today = date.today()
+        today = today or date.today()
         delta = today - p_date
         return max(0, delta.days)
     except Exception as e:
         print(f"Error calculating age: {e}")
         return 0
 
+def resolve_crop_key(crop_name):
+    """
+    Map a free-text crop name (English, Hindi or Hinglish) to a STAGES key.
+    Tries the whole text, then word phrases longest-first, each as one hash lookup,
+    so cost depends on the text length and not on the number of crops.
+    """
+    text = normalize_crop_text(crop_name)
+    if text in CROP_ALIASES:
+        return CROP_ALIASES[text]
+
+    words = text.split()
+    for size in range(min(MAX_ALIAS_WORDS, len(words)), 0, -1):
+        for i in range(len(words) - size + 1):
+            key = CROP_ALIASES.get(" ".join(words[i:i + size]))
+            if key:
+                return key
+    return DEFAULT_CROP_KEY
+
 def get_crop_stage(crop_name, age_days):
     """
     Determine crop stage based on age.
     """
-    # Normalize crop name match
-    crop_key = "General"
-    for key in STAGES:
-        if key.lower() in crop_name.lower():
-            crop_key = key
-            break
-            
-    schedule = STAGES[crop_key]
+    schedule = STAGES[resolve_crop_key(crop_name)]
     
     current_stage = "Unknown"
     for start, end, stage_name in schedule:
@@ -69,18 +115,137 @@ def get_crop_stage(crop_name, age_days):
             break
     
     if current_stage == "Unknown" and age_days > schedule[-1][1]:
-        current_stage = "Harvested / Post-Maturity"
+        current_stage = HARVESTED_STAGE
         
     return current_stage
 
+# --- Bulk (vectorized) stage computation for nightly jobs and dashboards ---
+
+CROP_KEYS = list(STAGES)
+
+@lru_cache(maxsize=1)
+def _stage_tables():
+    """
+    (stage_ends, stage_offsets, stage_labels), built on first bulk call so the
+    app's startup does not pay for importing numpy.
+    stage_ends: per-crop stage end days; stages are contiguous, so the first end >= age is the stage.
+    stage_labels: one flat table, stage_labels[stage_offsets[crop] + stage_index].
+    """
+    import numpy as np
+
+    stage_ends = {key: np.array([end for _, end, _ in STAGES[key]], dtype=np.int64) for key in CROP_KEYS}
+    labels = []
+    stage_offsets = np.zeros(len(CROP_KEYS), dtype=np.int64)
+    for i, key in enumerate(CROP_KEYS):
+        stage_offsets[i] = len(labels)
+        labels.extend(name for _, _, name in STAGES[key])
+        labels.append(HARVESTED_STAGE)
+    return stage_ends, stage_offsets, np.array(labels, dtype=object)
+
+BulkStages = namedtuple("BulkStages", ["crop_index", "ages", "stage_index", "stage_names"])
+
+def _parse_iso_dates(texts):
+    """
+    Vectorised parse of strings under the same rule as calculate_crop_age
+    (ISO_DATE, then a real calendar day); anything else becomes NaT.
+    """
+    import numpy as np
+
+    texts = np.asarray(texts, dtype=str)
+    parsed = np.full(len(texts), np.datetime64("NaT"), dtype="datetime64[D]")
+    if not len(texts):
+        return parsed
+    # One row of 10 code points per string (shorter strings are zero-padded)
+    codes = texts.astype("U10").view(np.uint32).reshape(-1, 10).astype(np.int64)
+    digits = codes[:, [0, 1, 2, 3, 5, 6, 8, 9]] - ord("0")
+    ok = ((np.char.str_len(texts) == 10) & (codes[:, 4] == ord("-")) & (codes[:, 7] == ord("-"))
+          & ((digits >= 0) & (digits <= 9)).all(axis=1))
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    ok &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+
+    months = ((year[ok] - 1970) * 12 + month[ok] - 1).astype("datetime64[M]")
+    days = months.astype("datetime64[D]") + (day[ok] - 1)
+    # Day 31 of a 30-day month etc. runs into the next month
+    in_month = days < (months + 1).astype("datetime64[D]")
+    ok[ok] = in_month
+    parsed[ok] = days[in_month]
+    return parsed
+
+def _to_datetime64(plantation_dates):
+    """
+    Parse "YYYY-MM-DD" strings/dates with the rule calculate_crop_age uses;
+    anything else becomes NaT. Strings are parsed in one vectorised pass and
+    only the other entries (date objects, None, ...) are looked at one by one.
+    """
+    import numpy as np
+
+    if isinstance(plantation_dates, np.ndarray) and plantation_dates.dtype.kind == "M":
+        return plantation_dates.astype("datetime64[D]")
+    values = list(plantation_dates)
+    is_text = np.fromiter((isinstance(value, str) for value in values), dtype=bool, count=len(values))
+    if is_text.all():
+        return _parse_iso_dates(values)
+
+    parsed = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[D]")
+    text_index = np.flatnonzero(is_text)
+    parsed[text_index] = _parse_iso_dates([values[i] for i in text_index])
+    for i in np.flatnonzero(~is_text):
+        if isinstance(values[i], (date, np.datetime64)):
+            parsed[i] = np.datetime64(values[i], "D")
+    return parsed
+
+def bulk_crop_stages(crop_names, plantation_dates, today=None):
+    """
+    Compute age and stage for many farmers at once.
+
+    Args:
+        crop_names: sequence of free-text crop names
+        plantation_dates: sequence of "YYYY-MM-DD" strings (or dates / datetime64)
+        today: date used as "now" (defaults to date.today()) for deterministic runs
+
+    Returns:
+        BulkStages of arrays aligned with the inputs:
+        crop_index (into CROP_KEYS), ages (days, invalid dates -> 0),
+        stage_index (into that crop's STAGES list; len(list) means harvested),
+        stage_names (labels matching get_crop_stage)
+    """
+    import numpy as np
+
+    stage_ends, stage_offsets, stage_labels = _stage_tables()
+    today = np.datetime64(today or date.today(), "D")
+    dates = _to_datetime64(plantation_dates)
+
+    ages = (today - dates).astype(np.int64)
+    # Same semantics as calculate_crop_age: invalid dates and future dates count as day 0
+    ages[np.isnat(dates)] = 0
+    np.maximum(ages, 0, out=ages)
+
+    # Resolve each distinct crop name once, then broadcast back
+    resolved = {}
+    crop_index = np.fromiter(
+        (resolved[name] if name in resolved else resolved.setdefault(name, CROP_KEYS.index(resolve_crop_key(str(name))))
+         for name in crop_names),
+        dtype=np.int64, count=len(crop_names)
+    )
+
+    stage_index = np.empty(len(ages), dtype=np.int64)
+    for i, key in enumerate(CROP_KEYS):
+        mask = crop_index == i
+        if mask.any():
+            stage_index[mask] = np.searchsorted(stage_ends[key], ages[mask], side="left")
+
+    stage_names = stage_labels[stage_offsets[crop_index] + stage_index]
+    return BulkStages(crop_index, ages, stage_index, stage_names)
+
 def get_mock_weather(location):
     """
     Mock weather data for demo purposes.
-    In a real app, this would call an API like OpenWeatherMap.
-    """
-    return {
-        "temp": "28°C",
-        "condition": "Sunny",
-        "humidity": "60%",
-        "forecast": "No rain expected in next 3 days"
-    }
+    Real forecasts come from get_weather (see utils/weather_provider.py).
+    """
+    return MockWeatherProvider().fetch(bucket_location(location))
+
+def get_weather(location):
+    """Current weather for a farm location via the configured provider (bucketed + cached)."""
+    return weather_service.get(location)
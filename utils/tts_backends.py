@@ -0,0 +1,218 @@
+"""
+Text-to-speech backends behind one interface.
+
+- gtts: Google TTS over the network (best voices, needs internet).
+- espeak-ng: local engine run as a subprocess (no network, robotic but instant).
+- pyttsx3: local engine through the pyttsx3 package, when it is installed.
+
+tts_router picks a backend per request. Backends are tried in the configured
+order; one whose breaker is open (repeated failures) is skipped, and one whose
+p95 latency exceeds TTS_MAX_LATENCY_SECONDS drops behind the ones that are fast
+enough. Latency samples expire after TTS_SAMPLE_MAX_AGE_SECONDS, and an open
+breaker lets a probe through after its cooldown. So a slow or dead rural link
+falls back to the local engine on its own, and gTTS is tried again and kept
+once it is fast.
+
+Configuration (environment):
+    TTS_BACKENDS              preference order (default "gtts,espeak-ng,pyttsx3")
+    TTS_MAX_LATENCY_SECONDS   p95 above which a backend is demoted (default 3)
+    TTS_SAMPLE_MAX_AGE_SECONDS  how long latency samples count (default 300)
+    ESPEAK_BIN                espeak-ng binary (default: espeak-ng or espeak on PATH)
+"""
+
+import io
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from importlib.util import find_spec
+
+from utils.provider_health import MIN_SAMPLES, ProviderStats
+
+logger = logging.getLogger("tts_backends")
+
+BACKEND_ORDER = [name.strip() for name in os.getenv("TTS_BACKENDS", "gtts,espeak-ng,pyttsx3").split(",") if name.strip()]
+MAX_LATENCY_SECONDS = float(os.getenv("TTS_MAX_LATENCY_SECONDS", "3"))
+# Latency samples older than this are forgotten, so a demoted backend gets traffic again
+SAMPLE_MAX_AGE_SECONDS = float(os.getenv("TTS_SAMPLE_MAX_AGE_SECONDS", "300"))
+BREAKER_COOLDOWN_SECONDS = 30.0
+# gTTS through the Indian endpoint connects more reliably for our users
+GTTS_TLD = "co.in"
+
+
+class TTSBackendError(Exception):
+    pass
+
+
+class TTSBackend:
+    """One speech engine. synthesize() returns encoded audio bytes (MP3, WAV, ...)."""
+
+    name = None
+
+    def __init__(self):
+        self.stats = ProviderStats(BREAKER_COOLDOWN_SECONDS, max_age_seconds=SAMPLE_MAX_AGE_SECONDS)
+
+    def available(self, lang):
+        raise NotImplementedError
+
+    def voice(self, lang):
+        """Identifies the voice in cache keys: clips from different voices never mix."""
+        return self.name
+
+    def synthesize(self, text, lang):
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+
+    def available(self, lang):
+        return find_spec("gtts") is not None
+
+    def voice(self, lang):
+        return GTTS_TLD
+
+    def synthesize(self, text, lang):
+        from gtts import gTTS
+
+        tts = gTTS(text=text, lang=lang, tld=GTTS_TLD, slow=False)
+        audio_fp = io.BytesIO()
+        tts.write_to_fp(audio_fp)
+        return audio_fp.getvalue()
+
+
+class EspeakBackend(TTSBackend):
+    name = "espeak-ng"
+    VOICES = {"en": "en", "hi": "hi"}
+
+    def __init__(self, binary=None):
+        super().__init__()
+        self.binary = binary or os.getenv("ESPEAK_BIN") or shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self, lang):
+        return bool(self.binary) and lang in self.VOICES
+
+    def synthesize(self, text, lang):
+        result = subprocess.run(
+            [self.binary, "-v", self.VOICES[lang], "-s", "150", "--stdin", "--stdout"],
+            input=text.encode("utf-8"), capture_output=True, timeout=15,
+        )
+        if result.returncode != 0 or not result.stdout:
+            raise TTSBackendError(f"espeak-ng failed: {result.stderr.decode('utf-8', 'replace')[:200]}")
+        return result.stdout  # WAV
+
+
+class Pyttsx3Backend(TTSBackend):
+    name = "pyttsx3"
+
+    def __init__(self):
+        super().__init__()
+        self._engine = None
+        self._voices = {}
+        self._lock = threading.Lock()  # pyttsx3 engines are not thread-safe
+
+    def _get_engine(self):
+        if self._engine is None:
+            import pyttsx3
+            self._engine = pyttsx3.init()
+            for voice in self._engine.getProperty("voices"):
+                tags = " ".join([voice.id, voice.name or ""] + [str(l) for l in voice.languages or []]).lower()
+                for lang in ("hi", "en"):
+                    if lang not in self._voices and (f"{lang}_" in tags or f"{lang}-" in tags or f"/{lang}" in tags):
+                        self._voices[lang] = voice.id
+        return self._engine
+
+    def available(self, lang):
+        if find_spec("pyttsx3") is None:
+            return False
+        try:
+            with self._lock:
+                self._get_engine()
+        except Exception:
+            return False
+        return lang in self._voices
+
+    def synthesize(self, text, lang):
+        with self._lock:
+            engine = self._get_engine()
+            engine.setProperty("voice", self._voices[lang])
+            fd, path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            try:
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+                with open(path, "rb") as f:
+                    data = f.read()
+            finally:
+                os.remove(path)
+        if not data:
+            raise TTSBackendError("pyttsx3 produced no audio")
+        return data
+
+
+BACKENDS = {backend.name: backend for backend in (GTTSBackend, EspeakBackend, Pyttsx3Backend)}
+
+
+class TTSRouter:
+    def __init__(self, backends=None):
+        self.backends = backends or [BACKENDS[name]() for name in BACKEND_ORDER if name in BACKENDS]
+        self._available = {}  # (name, lang) -> bool, checked once
+
+    def _log(self, event, **fields):
+        logger.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, ensure_ascii=False))
+
+    def installed(self, lang):
+        """Backends that can speak lang here, in configured order (health ignored)."""
+        out = []
+        for backend in self.backends:
+            key = (backend.name, lang)
+            if key not in self._available:
+                self._available[key] = backend.available(lang)
+            if self._available[key]:
+                out.append(backend)
+        return out
+
+    def ranked(self, lang):
+        """
+        Healthy backends for lang: configured order, those over the latency limit last.
+        No side effects: only synthesize() claims a half-open backend's probe.
+        """
+        fast, slow = [], []
+        for backend in self.installed(lang):
+            if not backend.stats.available():
+                continue
+            snap = backend.stats.snapshot()
+            too_slow = snap["samples"] >= MIN_SAMPLES and snap["p95"] is not None and snap["p95"] > MAX_LATENCY_SECONDS
+            (slow if too_slow else fast).append(backend)
+        return fast + slow
+
+    def synthesize(self, text, lang):
+        """(backend, audio bytes) from the first ranked backend that succeeds."""
+        errors = []
+        for backend in self.ranked(lang):
+            if not backend.stats.allow():
+                # Its half-open probe is already out with another request
+                continue
+            start = time.monotonic()
+            try:
+                data = backend.synthesize(text, lang)
+            except Exception as e:
+                if backend.stats.record(time.monotonic() - start, False) == "opened":
+                    self._log("breaker_open", backend=backend.name, error=str(e)[:200])
+                errors.append(f"{backend.name}: {e}")
+                continue
+            backend.stats.record(time.monotonic() - start, True)
+            if errors:
+                self._log("fallback", backend=backend.name, errors=errors)
+            return backend, data
+        raise TTSBackendError("; ".join(errors) or f"No TTS backend available for {lang}")
+
+    def stats(self):
+        return {backend.name: backend.stats.snapshot() for backend in self.backends}
+
+
+tts_router = TTSRouter()
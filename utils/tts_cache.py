@@ -0,0 +1,316 @@
+"""
+Content-addressed cache for synthesised speech.
+
+Clips are keyed on (cleaned text, lang, voice), so the same sentence is
+synthesised once and then served from memory or disk by every session and worker.
+The voice is the gTTS domain or the local engine's name (see utils.tts_backends).
+- Memory: an LRU bounded by bytes.
+- Disk: one <sha256>.<mp3|wav|...> file per clip, written atomically. When the directory
+  outgrows its byte budget, the least recently used files are evicted (by mtime,
+  which every hit refreshes).
+- prewarm() synthesises every fixed Smart Talk phrase in both languages, so the
+  welcome, category, question and done prompts play with no network round trip.
+
+Configuration (environment):
+    TTS_CACHE_ENABLED        "0" disables the cache (default "1")
+    TTS_CACHE_DIR            clip directory (default data/tts_cache)
+    TTS_CACHE_MAX_BYTES      disk budget (default 200 MB)
+    TTS_CACHE_MEMORY_BYTES   in-process LRU budget (default 32 MB)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import metrics
+from utils.tts_backends import GTTS_TLD, tts_router
+
+CACHE_DIR = os.getenv("TTS_CACHE_DIR", "data/tts_cache")
+CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") != "0"
+MAX_DISK_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(200 * 2 ** 20)))
+MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(32 * 2 ** 20)))
+
+# Eviction trims the disk store to this fraction of its budget
+EVICT_TO = 0.9
+# Startup pre-warm waits this long so the TTS engines are not loaded during the first page render
+PREWARM_DELAY_SECONDS = 2.0
+
+
+def clean_text_for_tts(text):
+    """Clean text for better speech synthesis."""
+    if not text: return ""
+    # Remove markdown formatting
+    text = re.sub(r'[*_#`]', '', text)
+    text = text.replace('•', '')
+    text = text.replace('-', '')
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def tts_lang(lang):
+    return 'hi' if lang == 'hi' else 'en'
+
+
+# Container sniffed from the first bytes -> (mime type, file extension)
+AUDIO_FORMATS = [
+    (b"RIFF", "audio/wav", "wav"),
+    (b"OggS", "audio/ogg", "ogg"),
+    (b"FORM", "audio/aiff", "aiff"),
+]
+EXTENSIONS = ["mp3"] + [ext for _, _, ext in AUDIO_FORMATS]
+
+
+def audio_format(data):
+    """(mime type, extension) of encoded audio; MP3 unless another container is recognised."""
+    for magic, mime, ext in AUDIO_FORMATS:
+        if data.startswith(magic):
+            return mime, ext
+    return "audio/mpeg", "mp3"
+
+
+def make_key(text, lang, voice=GTTS_TLD):
+    """Content address of one clip: sha256 over the cleaned text, language and voice."""
+    payload = json.dumps([unicodedata.normalize("NFC", clean_text_for_tts(text)), tts_lang(lang), voice],
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    def __init__(self, directory=CACHE_DIR, max_disk_bytes=MAX_DISK_BYTES, memory_bytes=MEMORY_BYTES,
+                 enabled=CACHE_ENABLED):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_bytes = memory_bytes
+        self.enabled = enabled
+        self._memory = OrderedDict()  # key -> bytes
+        self._memory_size = 0
+        self._disk_size = None        # scanned on first write
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+
+    def path(self, key, ext="mp3"):
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def find_path(self, key):
+        """Path of the clip on disk, or None."""
+        for ext in EXTENSIONS:
+            path = self.path(key, ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _remember(self, key, data):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= len(old)
+            self._memory[key] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def contains(self, key):
+        """True if the clip is cached (not counted as a hit or miss)."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if key in self._memory:
+                return True
+        return self.find_path(key) is not None
+
+    def get(self, key):
+        """Cached MP3 bytes, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return data
+        path = self.find_path(key)
+        try:
+            if path is None:
+                raise FileNotFoundError(key)
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # recently used: survives eviction longer
+        except OSError:
+            data = None
+        with self._lock:
+            self.stats["disk_hits" if data else "misses"] += 1
+        if data:
+            self._remember(key, data)
+        return data or None
+
+    def put(self, key, data):
+        if not self.enabled or not data:
+            return
+        self._remember(key, data)
+        path = self.path(key, audio_format(data)[1])
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"TTS cache write error: {e}")
+            return
+        with self._lock:
+            self.stats["stores"] += 1
+            if self._disk_size is None:
+                self._disk_size = self._scan_size()
+            else:
+                self._disk_size += len(data)
+            evict = self._disk_size > self.max_disk_bytes
+        if evict:
+            self._evict()
+
+    def _scan_size(self):
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.rsplit(".", 1)[-1] in EXTENSIONS:
+                total += entry.stat().st_size
+        return total
+
+    def _evict(self):
+        """Delete least recently used clips until the store is back under EVICT_TO of its budget."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.rsplit(".", 1)[-1] in EXTENSIONS:
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._disk_size = total
+            self.stats["evicted"] += removed
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self._disk_size = 0
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.rsplit(".", 1)[-1] in EXTENSIONS:
+                    os.remove(entry.path)
+
+
+audio_cache = AudioCache()
+
+
+def _voices(lang):
+    """
+    Voices whose clips may be served now: installed backends in preference order,
+    up to the one the router would use. A clip made by the local engine while gTTS
+    was down is replaced by a gTTS one once gTTS is healthy again. ranked() has no
+    side effects, so this never takes a half-open backend's probe from synthesize().
+    """
+    ranked = tts_router.ranked(lang)
+    voices = []
+    for backend in tts_router.installed(lang):
+        voices.append(backend.voice(lang))
+        if ranked and backend is ranked[0]:
+            break
+    return voices
+
+
+def lookup(text, lang):
+    """(key, cached bytes) of the best servable cached clip, else (None, None)."""
+    for voice in _voices(lang):
+        key = make_key(text, lang, voice)
+        data = audio_cache.get(key)
+        if data is not None:
+            return key, data
+    return None, None
+
+
+def synthesize_clip(text, lang='en'):
+    """
+    (key, encoded audio bytes) for text: MP3 from gTTS, or a local engine's output
+    compressed by utils.audio_media. Served from the cache when a servable clip
+    exists; on a miss tts_router picks the backend. Raises TTSBackendError if
+    every backend fails. The key names the clip for the /audio route.
+    """
+    from utils.audio_media import compress_audio
+
+    text = clean_text_for_tts(text)
+    lang = tts_lang(lang)
+    with metrics.timer("tts", lang=lang) as span:
+        span.set(chars=len(text))
+        key, data = lookup(text, lang)
+        if data is not None:
+            span.label(engine="cache", outcome="cache_hit")
+        else:
+            backend, data = tts_router.synthesize(text, lang)
+            span.label(engine=backend.name)
+            data = compress_audio(data)
+            key = make_key(text, lang, backend.voice(lang))
+            audio_cache.put(key, data)
+        span.set(bytes=len(data))
+        metrics.observe("tts_audio_bytes", len(data), lang=lang)
+        return key, data
+
+
+def synthesize(text, lang='en'):
+    """Encoded audio bytes for text (see synthesize_clip)."""
+    return synthesize_clip(text, lang)[1]
+
+
+def prewarm(phrases_by_lang, max_workers=4):
+    """
+    Synthesise every phrase not cached yet. phrases_by_lang: {lang: [text, ...]}.
+    Returns {"cached": n, "synthesised": n, "failed": n}.
+    """
+    report = {"cached": 0, "synthesised": 0, "failed": 0}
+    todo = []
+    for lang, phrases in phrases_by_lang.items():
+        voices = _voices(lang)
+        for text in phrases:
+            if any(audio_cache.contains(make_key(text, lang, voice)) for voice in voices):
+                report["cached"] += 1
+            else:
+                todo.append((text, lang))
+
+    def warm(item):
+        try:
+            synthesize(*item)
+            return "synthesised"
+        except Exception as e:
+            print(f"TTS prewarm failed for {item[1]} phrase: {e}")
+            return "failed"
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for outcome in pool.map(warm, todo):
+            report[outcome] += 1
+    report["seconds"] = round(time.monotonic() - start, 2)
+    return report
+
+
+def prewarm_in_background(phrases_by_lang, delay=PREWARM_DELAY_SECONDS):
+    """Run prewarm() on a daemon thread after delay seconds (network bound; never blocks a page render)."""
+    timer = threading.Timer(delay, prewarm, args=(phrases_by_lang,))
+    timer.name = "tts-prewarm"
+    timer.daemon = True
+    timer.start()
+    return timer
@@ -0,0 +1,119 @@
+"""
+Sentence-chunked speech synthesis.
+
+- Text is split at sentence ends (. ! ? and the Devanagari danda ।). Very short
+  sentences are joined to the next one; overlong ones are split at commas or spaces.
+- What gets spoken is limited by a duration budget (estimated from characters per
+  second), cutting only between sentences, instead of a character slice.
+- Chunks are synthesised concurrently on one bounded pool shared by all sessions.
+  They are yielded in order as soon as each is ready, so playback of the first
+  chunk starts while the rest are still being made. Each chunk is cached on its own.
+
+Configuration (environment):
+    TTS_MAX_SECONDS   spoken-length budget per reply (default 40)
+    TTS_WORKERS       concurrent synthesis requests across the process (default 4)
+"""
+
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import metrics
+from utils.tts_cache import clean_text_for_tts, synthesize_clip
+
+MAX_SECONDS = float(os.getenv("TTS_MAX_SECONDS", "40"))
+WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+
+# Approximate gTTS speaking rate, in characters of cleaned text per second
+CHARS_PER_SECOND = {"en": 15.0, "hi": 12.0}
+# Sentences shorter than this ride along with the next one (e.g. "Hello Farmer!")
+MIN_CHUNK_CHARS = 24
+# gTTS makes one request per ~100 characters; longer chunks only delay the first audio
+MAX_CHUNK_CHARS = 160
+
+# A sentence ends at . ! ? । ॥ followed by whitespace (so 2.5 and e.g. "Rs.500" stay intact)
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+")
+_SOFT_BREAK = re.compile(r"(?<=[,;:])\s+")
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="tts")
+
+
+def estimate_seconds(text, lang='en'):
+    return len(text) / CHARS_PER_SECOND.get(lang, CHARS_PER_SECOND["en"])
+
+
+def _split_long(sentence):
+    """Pieces of at most MAX_CHUNK_CHARS, broken at commas where possible, else at spaces."""
+    pieces = []
+    for part in _SOFT_BREAK.split(sentence):
+        while len(part) > MAX_CHUNK_CHARS:
+            cut = part.rfind(" ", 0, MAX_CHUNK_CHARS)
+            cut = cut if cut > 0 else MAX_CHUNK_CHARS
+            pieces.append(part[:cut].strip())
+            part = part[cut:].strip()
+        if pieces and len(pieces[-1]) + len(part) + 1 <= MAX_CHUNK_CHARS:
+            pieces[-1] += " " + part
+        elif part:
+            pieces.append(part)
+    return pieces
+
+
+def split_sentences(text):
+    """Cleaned text split into speakable chunks (English and Hindi)."""
+    text = clean_text_for_tts(text)
+    chunks, carry = [], ""
+    for sentence in _SENTENCE_END.split(text):
+        sentence = (carry + " " + sentence).strip() if carry else sentence.strip()
+        carry = ""
+        if not sentence:
+            continue
+        if len(sentence) < MIN_CHUNK_CHARS:
+            carry = sentence
+        elif len(sentence) > MAX_CHUNK_CHARS:
+            chunks.extend(_split_long(sentence))
+        else:
+            chunks.append(sentence)
+    if carry:
+        if chunks and len(chunks[-1]) + len(carry) + 1 <= MAX_CHUNK_CHARS:
+            chunks[-1] += " " + carry
+        else:
+            chunks.append(carry)
+    return chunks
+
+
+def speech_chunks(text, lang='en', max_seconds=None):
+    """The chunks of text that fit the duration budget; stops at a chunk boundary."""
+    budget = MAX_SECONDS if max_seconds is None else max_seconds
+    chunks, spoken = [], 0.0
+    for chunk in split_sentences(text):
+        seconds = estimate_seconds(chunk, lang)
+        if spoken + seconds > budget:
+            if not chunks:
+                # A single over-budget chunk: keep the words that fit
+                cut = chunk.rfind(" ", 0, int(budget * CHARS_PER_SECOND.get(lang, CHARS_PER_SECOND["en"])))
+                chunks.append(chunk[:cut] if cut > 0 else chunk)
+            break
+        chunks.append(chunk)
+        spoken += seconds
+    return chunks
+
+
+def synthesize_chunks(chunks, lang='en'):
+    """
+    Yield (index, cache key, audio bytes) in order. All chunks are submitted at
+    once, so later ones are synthesised while earlier ones are being played. A
+    chunk that fails raises when its turn comes; earlier ones were already yielded.
+    """
+    start = time.monotonic()
+    futures = [_pool.submit(synthesize_clip, chunk, lang) for chunk in chunks]
+    try:
+        for index, future in enumerate(futures):
+            key, data = future.result()
+            if index == 0:
+                metrics.observe("tts_first_chunk_seconds", time.monotonic() - start, lang=lang)
+            yield index, key, data
+    finally:
+        for future in futures:
+            future.cancel()
+    metrics.observe("tts_chunks", len(chunks), lang=lang)
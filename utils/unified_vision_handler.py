@@ -10,8 +10,12 @@ class UnifiedVisionHandler:
         # Using text-based advisory since all free vision APIs are decommissioned
         self.use_text_fallback = True
     
-    def get_vision_response(self, prompt, image_data, system_instruction=None):
-        """Returns disease advisory guide"""
+    def get_vision_response(self, prompt, image_data, system_instruction=None, max_tokens=None):
+        """
+        Returns disease advisory guide.
+        max_tokens (from token_budget.max_tokens_for("disease", lang)) caps the reply
+        of a vision client; the text guide has no completion to cap.
+        """
         advisory = text_disease_advisor.get_advisory(prompt)
         return advisory, "Text-Based Disease Guide"
 
@@ -1,19 +1,18 @@
 """
-Voice API Handler using Groq Whisper (STT) and gTTS (TTS)
+Voice API Handler using Groq Whisper (STT) and the shared TTS backends (TTS)
 Free and reliable alternative to browser Web Speech API
 """
 
-import os
-import io
 import base64
-from gtts import gTTS
-from groq import Groq
+
+from utils.http_clients import get_groq
+from utils.rate_limiter import groq_scheduler
 
 class VoiceAPIHandler:
-    def __init__(self):
-        """Initialize with Groq client for Whisper"""
-        api_key = os.getenv("GROQ_API_KEY")
-        self.client = Groq(api_key=api_key) if api_key else None
+    @property
+    def client(self):
+        """Shared Groq client for Whisper (None without GROQ_API_KEY)"""
+        return get_groq()
     
     def transcribe_audio(self, audio_file, language='en'):
         """
@@ -33,12 +32,13 @@ class VoiceAPIHandler:
             # Groq Whisper supports multiple languages
             lang_code = 'hi' if language == 'hi' else 'en'
             
-            transcription = self.client.audio.transcriptions.create(
+            # Counts against the shared request quota; no LLM tokens
+            transcription = groq_scheduler.call(lambda: self.client.audio.transcriptions.create(
                 file=audio_file,
                 model="whisper-large-v3",
                 language=lang_code,
                 response_format="text"
-            )
+            ))
             
             return transcription
         except Exception as e:
@@ -46,32 +46,24 @@ class VoiceAPIHandler:
     
     def text_to_speech(self, text, language='en'):
         """
-        Convert text to speech using gTTS (Google Text-to-Speech)
-        Free and reliable for both English and Hindi
-        
+        Convert text to speech using the shared TTS backends
+        (gTTS, or a local engine when Google is unreachable) and audio cache
+
         Args:
             text: Text to convert
             language: 'en' or 'hi'
-        
+
         Returns:
-            bytes: Audio data in MP3 format
+            bytes: Audio data (MP3 from gTTS, WAV from a local engine)
         """
+        from utils.tts_cache import synthesize
+
         try:
-            lang_code = 'hi' if language == 'hi' else 'en'
-            
-            # Create TTS object
-            tts = gTTS(text=text, lang=lang_code, slow=False)
-            
-            # Save to bytes
-            audio_fp = io.BytesIO()
-            tts.write_to_fp(audio_fp)
-            audio_fp.seek(0)
-            
-            return audio_fp.read()
+            return synthesize(text, language)
         except Exception as e:
             print(f"TTS Error: {e}")
             return None
-    
+
     def get_audio_base64(self, audio_bytes):
         """Convert audio bytes to base64 for embedding in HTML"""
         if audio_bytes:
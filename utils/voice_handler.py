@@ -17,19 +17,13 @@ class VoiceHandler:
     @staticmethod
     def speech_synthesis(text, lang='en'):
         """
-        Synthesizes text to speech using gTTS and returns the audio bytes.
+        Synthesizes text to speech and returns the audio bytes.
+        Uses the shared TTS backends (gTTS, or a local engine offline) and audio cache.
         """
-        from gtts import gTTS
-        import io
-        
-        # gTTS uses ISO 639-1 language codes (e.g., 'en', 'hi')
-        tts_lang = 'hi' if lang == 'hi' else 'en'
-        
+        from utils.tts_cache import synthesize
+
         try:
-            tts = gTTS(text=text, lang=tts_lang)
-            fp = io.BytesIO()
-            tts.write_to_fp(fp)
-            return fp.getvalue()
+            return synthesize(text, lang)
         except Exception as e:
             st.error(f"TTS Error: {e}")
             return None
@@ -0,0 +1,275 @@
+"""
+Weather provider layer for Track Farming.
+Locations are bucketed (lat/lon grid cell or district name) so nearby farms
+share one forecast. Forecasts are cached per bucket with a TTL and an LRU size
+cap, and concurrent lookups for the same bucket wait on a single fetch.
+
+Provider is chosen with WEATHER_PROVIDER=mock (default) or open-meteo.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.http_clients import get_session
+
+GRID_DEGREES = 0.25
+CACHE_TTL_SECONDS = float(os.getenv("WEATHER_CACHE_TTL", "1800"))
+CACHE_MAX_BUCKETS = int(os.getenv("WEATHER_CACHE_SIZE", "2048"))
+REFRESH_WORKERS = 8
+
+UNAVAILABLE_WEATHER = {
+    "temp": "N/A",
+    "condition": "Unavailable",
+    "humidity": "N/A",
+    "forecast": "Weather data unavailable right now",
+    "rain_mm": None
+}
+
+# 3-day rain totals (mm) -> outlook band; the band, not the exact total, decides advice
+RAIN_BANDS = [(1, "dry"), (10, "light rain"), (40, "moderate rain")]
+
+_LATLON = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def bucket_location(location):
+    """
+    Bucket key for a free-text farm location.
+    "lat, lon" snaps to a GRID_DEGREES grid cell; "Village/City, District[, State]"
+    uses the district part; a single name is used as-is.
+    """
+    text = str(location or "").strip()
+    match = _LATLON.match(text)
+    if match:
+        lat, lon = (round(float(v) / GRID_DEGREES) * GRID_DEGREES for v in match.groups())
+        return f"grid:{lat:.2f},{lon:.2f}"
+    parts = [" ".join(p.split()).lower() for p in text.split(",") if p.strip()]
+    if not parts:
+        return "unknown"
+    return "district:" + (parts[1] if len(parts) >= 2 else parts[0])
+
+
+class WeatherProvider:
+    """Interface: fetch(bucket) -> {"temp", "condition", "humidity", "forecast"}; raise on failure."""
+
+    name = "base"
+
+    def fetch(self, bucket):
+        raise NotImplementedError
+
+
+class MockWeatherProvider(WeatherProvider):
+    """Fixed demo values (no network)."""
+
+    name = "mock"
+
+    def fetch(self, bucket):
+        return {
+            "temp": "28°C",
+            "condition": "Sunny",
+            "humidity": "60%",
+            "forecast": "No rain expected in next 3 days",
+            "rain_mm": 0.0
+        }
+
+
+# WMO weather codes used by Open-Meteo
+WEATHER_CODES = [
+    ((0,), "Sunny"),
+    ((1, 2), "Partly Cloudy"),
+    ((3,), "Cloudy"),
+    ((45, 48), "Foggy"),
+    (tuple(range(51, 68)), "Rain"),
+    (tuple(range(71, 78)), "Snow"),
+    ((80, 81, 82), "Showers"),
+    ((95, 96, 99), "Thunderstorm"),
+]
+
+
+class OpenMeteoProvider(WeatherProvider):
+    """
+    Open-Meteo geocoding + forecast APIs (free, no key).
+    Base URLs are configurable so tests can point at a local stub server.
+    """
+
+    name = "open-meteo"
+
+    def __init__(self, forecast_url=None, geocoding_url=None, timeout=10):
+        self.forecast_url = forecast_url or os.getenv("WEATHER_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+        self.geocoding_url = geocoding_url or os.getenv("WEATHER_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
+        self.timeout = timeout
+        # District coordinates never change; keep them for the process lifetime
+        self._coordinates = {}
+
+    def _coordinates_for(self, bucket):
+        kind, _, value = bucket.partition(":")
+        if kind == "grid":
+            lat, lon = value.split(",")
+            return float(lat), float(lon)
+        if bucket not in self._coordinates:
+            response = get_session("weather").get(
+                self.geocoding_url,
+                params={"name": value, "count": 1, "country_code": "IN"},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            results = response.json().get("results") or []
+            if not results:
+                raise ValueError(f"Location not found: {value}")
+            self._coordinates[bucket] = (results[0]["latitude"], results[0]["longitude"])
+        return self._coordinates[bucket]
+
+    def fetch(self, bucket):
+        lat, lon = self._coordinates_for(bucket)
+        response = get_session("weather").get(
+            self.forecast_url,
+            params={
+                "latitude": lat,
+                "longitude": lon,
+                "current": "temperature_2m,relative_humidity_2m,weather_code",
+                "daily": "precipitation_sum",
+                "forecast_days": 3,
+                "timezone": "auto"
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        current = data["current"]
+        rain_mm = sum(v or 0 for v in data.get("daily", {}).get("precipitation_sum", []))
+
+        condition = "Unknown"
+        for codes, label in WEATHER_CODES:
+            if current.get("weather_code") in codes:
+                condition = label
+                break
+
+        return {
+            "temp": f"{round(current['temperature_2m'])}°C",
+            "condition": condition,
+            "humidity": f"{round(current['relative_humidity_2m'])}%",
+            "forecast": "No rain expected in next 3 days" if rain_mm < 1
+                        else f"About {rain_mm:.0f} mm rain expected in next 3 days",
+            "rain_mm": rain_mm
+        }
+
+
+def rain_outlook(weather):
+    """
+    Coarse 3-day outlook ("dry", "light rain", ...) that stays the same while only
+    live readings (temperature, humidity, the exact rain total) move during the day.
+    """
+    rain_mm = weather.get("rain_mm")
+    if rain_mm is None:
+        # Provider without a rain total: its forecast line is the best stable input
+        return " ".join(str(weather.get("forecast", "")).split()).lower()
+    for limit, label in RAIN_BANDS:
+        if rain_mm < limit:
+            return label
+    return "heavy rain"
+
+
+def provider_from_env():
+    name = os.getenv("WEATHER_PROVIDER", "mock").lower()
+    if name == "open-meteo":
+        return OpenMeteoProvider()
+    return MockWeatherProvider()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+
+
+class WeatherService:
+    """Bucketed, cached, coalescing front for a WeatherProvider."""
+
+    def __init__(self, provider=None, ttl=CACHE_TTL_SECONDS, max_buckets=CACHE_MAX_BUCKETS):
+        self.provider = provider or provider_from_env()
+        self.ttl = ttl
+        self.max_buckets = max_buckets
+        self._cache = OrderedDict()  # bucket -> (expires_at, weather)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "fetches": 0, "errors": 0}
+
+    def _cached(self, bucket, now):
+        entry = self._cache.get(bucket)
+        if entry and entry[0] > now:
+            self._cache.move_to_end(bucket)
+            return entry[1]
+        return None
+
+    def get(self, location):
+        """Weather for one farm location."""
+        return self.get_bucket(bucket_location(location))
+
+    def get_bucket(self, bucket):
+        with self._lock:
+            weather = self._cached(bucket, time.monotonic())
+            if weather is not None:
+                self.stats["hits"] += 1
+                return weather
+            self.stats["misses"] += 1
+            waiter = self._in_flight.get(bucket)
+            leader = waiter is None
+            if leader:
+                waiter = self._in_flight[bucket] = _InFlight()
+
+        if not leader:
+            # Someone else is already fetching this bucket
+            waiter.done.wait()
+            return waiter.value
+
+        try:
+            waiter.value = self._fetch(bucket)
+        finally:
+            with self._lock:
+                del self._in_flight[bucket]
+            waiter.done.set()
+        return waiter.value
+
+    def _fetch(self, bucket):
+        try:
+            weather = self.provider.fetch(bucket)
+        except Exception as e:
+            print(f"Weather fetch failed for {bucket}: {e}")
+            with self._lock:
+                self.stats["errors"] += 1
+                stale = self._cache.get(bucket)
+            # Prefer a stale forecast over nothing; failures are not cached
+            return stale[1] if stale else dict(UNAVAILABLE_WEATHER)
+
+        with self._lock:
+            self.stats["fetches"] += 1
+            self._cache[bucket] = (time.monotonic() + self.ttl, weather)
+            self._cache.move_to_end(bucket)
+            while len(self._cache) > self.max_buckets:
+                self._cache.popitem(last=False)
+        return weather
+
+    def get_many(self, locations):
+        """Weather for many locations; each distinct bucket is fetched at most once."""
+        buckets = {location: bucket_location(location) for location in set(locations)}
+        unique = set(buckets.values())
+        with ThreadPoolExecutor(max_workers=min(REFRESH_WORKERS, max(1, len(unique)))) as pool:
+            by_bucket = dict(zip(unique, pool.map(self.get_bucket, unique)))
+        return {location: by_bucket[bucket] for location, bucket in buckets.items()}
+
+    def refresh(self, locations):
+        """Re-fetch every distinct bucket once, ignoring the TTL (nightly warm-up). Returns bucket count."""
+        unique = {bucket_location(location) for location in locations}
+        with ThreadPoolExecutor(max_workers=min(REFRESH_WORKERS, max(1, len(unique)))) as pool:
+            list(pool.map(self._fetch, unique))
+        return len(unique)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+weather_service = WeatherService()